@@ -1,12 +1,14 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_bcrypt import Bcrypt
 from dotenv import load_dotenv
 import os
 from routes.auth import auth_bp
 from routes.churn import churn_bp
 from routes.sales import sales_bp
+from routes.jobs import jobs_bp
+from scoring import warm_scorer
+from metrics import request_metrics
 
 load_dotenv()
 
@@ -18,12 +20,19 @@ app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 # Initialize extensions
 CORS(app)
 jwt = JWTManager(app)
-bcrypt = Bcrypt(app)
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(churn_bp, url_prefix='/api')
 app.register_blueprint(sales_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+
+# Prometheus-format request latency/size and hashing pool gauges at /metrics
+request_metrics.init_app(app)
+
+# Load the current churn model once, in the background, so /api/churn/score
+# never touches disk per request and worker boot doesn't wait on scikit-learn
+warm_scorer()
 
 @app.route('/')
 def home():
@@ -0,0 +1,69 @@
+import os
+import threading
+
+from flask import jsonify, request, send_file
+
+ARROW_DIR = os.getenv('ARROW_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '../ml-service/data/arrow'))
+ARROW_FILE_MIMETYPE = 'application/vnd.apache.arrow.file'
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+class ArrowSections:
+    """Memory-mapped Arrow IPC tables written by ml-service/columnar_export.py.
+
+    Tables reference the mapped file directly, so opening one costs no copy
+    and every worker shares the same page cache. pyarrow is imported on
+    first use to keep it out of worker boot time.
+    """
+
+    def __init__(self, base_dir=ARROW_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def path(self, dataset, section):
+        # Section names come from the URL; keep them inside base_dir
+        if not section.isidentifier():
+            raise FileNotFoundError(section)
+        return os.path.join(self.base_dir, dataset, f'{section}.arrow')
+
+    def table(self, dataset, section):
+        path = self.path(dataset, section)
+        mtime = os.stat(path).st_mtime_ns
+        key = (dataset, section)
+        cached = self._tables.get(key)
+        if cached is None or cached[0] != mtime:
+            import pyarrow as pa
+
+            with self._lock:
+                source = pa.memory_map(path, 'r')
+                table = pa.ipc.open_file(source).read_all()
+                cached = (mtime, table)
+                self._tables[key] = cached
+        return cached[1]
+
+
+arrow_sections = ArrowSections()
+
+
+def section_response(dataset, section):
+    """Arrow IPC for clients that accept it, JSON records otherwise."""
+    best = request.accept_mimetypes.best_match(
+        ['application/json', ARROW_FILE_MIMETYPE, ARROW_STREAM_MIMETYPE], default='application/json')
+    try:
+        if best == ARROW_FILE_MIMETYPE:
+            # The file on disk already is the response body
+            return send_file(arrow_sections.path(dataset, section), mimetype=ARROW_FILE_MIMETYPE,
+                             conditional=True, etag=True)
+        table = arrow_sections.table(dataset, section)
+    except FileNotFoundError:
+        return jsonify({'message': f'Section {section} not found'}), 404
+
+    if best == ARROW_STREAM_MIMETYPE:
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), 200, {'Content-Type': ARROW_STREAM_MIMETYPE}
+    return jsonify(table.to_pylist())
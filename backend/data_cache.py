@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+
+from flask import Response, request
+
+from snapshot_store import get_snapshot_store
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FILE_CHECK_INTERVAL = float(os.getenv('DATA_FILE_CHECK_INTERVAL', '1'))
+
+
+class CachedPayload:
+    def __init__(self, data, last_modified, body=None):
+        self.data = data
+        self.timestamp = last_modified
+        self.body = body or json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.last_modified = formatdate(last_modified, usegmt=True)
+        self.encoded = {
+            'identity': self.body,
+            'gzip': gzip.compress(self.body, compresslevel=6),
+        }
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=5)
+
+    def etag_for(self, encoding):
+        # Each content-coding is its own representation, so it gets its own strong ETag
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+    @classmethod
+    def from_body(cls, body, last_modified):
+        return cls(json.loads(body), last_modified, body)
+
+
+class DatasetCache:
+    """Serializes a JSON dataset once per version.
+
+    The dataset is either the generated file under ml-service/data or the
+    last payload POSTed to any worker (kept in the shared snapshot store),
+    whichever is newer.
+    """
+
+    def __init__(self, path, name, snapshots=None):
+        self.path = path
+        self.name = name
+        self.snapshots = snapshots or get_snapshot_store()
+        self._lock = threading.Lock()
+        self._file_entry = None
+        self._snapshot_entry = None
+        self._snapshot_version = 0
+        self._file_checked = 0
+
+    def publish(self, data):
+        entry = CachedPayload(data, time.time())
+        version = self.snapshots.publish(self.name, entry.body)
+        with self._lock:
+            # Adopt the payload just built rather than reading it back, unless
+            # another publish has already superseded it
+            if version == self.snapshots.version(self.name):
+                entry.timestamp = os.stat(self.snapshots.path(self.name)).st_mtime
+                self._snapshot_entry = entry
+                self._snapshot_version = version
+        return self.get()
+
+    def _refresh_snapshot(self):
+        # One memory read per request; the file is only read when another
+        # worker (or this one) has published a new version
+        version = self.snapshots.version(self.name)
+        if version != self._snapshot_version:
+            body, mtime = self.snapshots.read(self.name)
+            self._snapshot_entry = CachedPayload.from_body(body, mtime)
+            self._snapshot_version = version
+
+    def _refresh_file(self):
+        # Regenerated files are picked up within FILE_CHECK_INTERVAL seconds
+        now = time.monotonic()
+        if self._file_entry is not None and now - self._file_checked < FILE_CHECK_INTERVAL:
+            return
+        self._file_checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if self._file_entry is None or mtime != self._file_entry.timestamp:
+            with open(self.path, 'rb') as f:
+                self._file_entry = CachedPayload.from_body(f.read(), mtime)
+
+    def get(self):
+        with self._lock:
+            self._refresh_snapshot()
+            self._refresh_file()
+            entries = [e for e in (self._snapshot_entry, self._file_entry) if e is not None]
+            if not entries:
+                raise FileNotFoundError(self.path)
+            return max(entries, key=lambda e: e.timestamp)
+
+
+def _pick_encoding(entry):
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in entry.encoded and accepted[encoding]:
+            return encoding
+    return 'identity'
+
+
+def cached_response(entry):
+    encoding = _pick_encoding(entry)
+    etag = entry.etag_for(encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.encoded[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = entry.last_modified
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
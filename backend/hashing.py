@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+
+# bcrypt cost and pool sizing; hashes with a different cost are upgraded on login
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', '2'))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '32'))
+HASH_TIMEOUT = float(os.getenv('HASH_TIMEOUT', '5'))
+
+
+class HashQueueFull(Exception):
+    pass
+
+
+class HashTimeout(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(pw_hash, password):
+    return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+
+
+def hash_rounds(pw_hash):
+    # bcrypt hashes look like $2b$12$<salt+digest>
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small process pool so request threads stay free.
+
+    At most queue_limit hashes may be queued or running; beyond that calls
+    fail fast with HashQueueFull instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT,
+                 rounds=BCRYPT_LOG_ROUNDS, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.depth = 0
+        self.max_depth = 0
+        self.rejected = 0
+        self.latency = {'hash': [0, 0.0, 0.0], 'check': [0, 0.0, 0.0]}  # count, total, max
+
+    def _get_pool(self):
+        # Created lazily so each gunicorn worker owns its pool
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _release(self, future):
+        # Runs when the job actually finishes, so a timed-out hash keeps its
+        # slot until the pool is done with it
+        with self._lock:
+            self.depth -= 1
+        self._slots.release()
+
+    def _run(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashQueueFull()
+        with self._lock:
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+        start = time.perf_counter()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashTimeout()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self.latency[op]
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+
+    def hash(self, password):
+        return self._run('hash', _hash, password, self.rounds)
+
+    def check(self, pw_hash, password):
+        return self._run('check', _check, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self.rounds
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'queue_depth': self.depth,
+                'max_queue_depth': self.max_depth,
+                'rejected': self.rejected,
+                'latency': {
+                    op: {
+                        'count': count,
+                        'avg_ms': round(total / count * 1000, 2) if count else 0,
+                        'max_ms': round(peak * 1000, 2),
+                    }
+                    for op, (count, total, peak) in self.latency.items()
+                },
+            }
+
+
+hasher = PasswordHasher()
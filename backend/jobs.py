@@ -0,0 +1,225 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process deduplication only
+    fcntl = None
+
+from snapshot_store import SNAPSHOT_DIR
+
+ML_SERVICE_DIR = os.getenv('ML_SERVICE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '../ml-service'))
+ML_PYTHON = os.getenv('ML_PYTHON', sys.executable)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))
+JOB_HISTORY = 50
+
+# Must match ml-service/stages.py
+EVENT_PREFIX = '##stage '
+
+# Each script writes its outputs to a temp file and renames it, so the
+# serving path only ever sees complete results
+JOB_COMMANDS = {
+    'churn': ['generate_churn_data.py'],
+    'sales': ['generate_sales_data.py', '--no-post'],
+    'model': ['churn_model.py'],
+}
+
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobAlreadyRunning(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.current_stage = None
+        self.stages = OrderedDict()
+        self.measurements = []
+        self.returncode = None
+        self.output = deque(maxlen=20)
+
+    def handle_line(self, line):
+        """Apply one line of output; returns True if it was a stage event."""
+        if not line.startswith(EVENT_PREFIX):
+            self.output.append(line)
+            return False
+        event = json.loads(line[len(EVENT_PREFIX):])
+        name = event['stage']
+        if event['event'] == 'start':
+            self.current_stage = name
+            self.stages.setdefault(name, {'status': 'running', 'seconds': 0})['status'] = 'running'
+        elif event['event'] == 'end':
+            stage = self.stages.setdefault(name, {'seconds': 0})
+            stage['status'] = 'done'
+            stage['seconds'] = round(stage['seconds'] + event['seconds'], 3)
+            stage['cpu_seconds'] = event.get('cpu_seconds')
+            stage['peak_rss_mb'] = event.get('peak_rss_mb')
+        elif event['event'] == 'measure':
+            # Steps inside a stage (model fits, CSV load, JSON dump)
+            self.measurements.append({'name': name, **{k: v for k, v in event.items() if k not in ('stage', 'event')}})
+        else:
+            self.stages.setdefault(name, {'seconds': 0})['status'] = event['event']
+        return True
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'current_stage': self.current_stage,
+            'stages': [{'name': name, **stage} for name, stage in self.stages.items()],
+            'measurements': self.measurements,
+            'returncode': self.returncode,
+            'output': list(self.output) if self.status == 'failed' else [],
+        }
+
+
+class SharedJob:
+    """A job run by another worker, as last published to its state file."""
+
+    def __init__(self, data):
+        self.data = data
+        self.id = data['id']
+        self.kind = data['kind']
+        self.status = data['status']
+
+    def to_dict(self):
+        return self.data
+
+
+class JobRunner:
+    """Runs ml-service regeneration scripts on a background thread pool.
+
+    A trigger for a kind that is already queued or running returns the
+    existing job. Across gunicorn workers the same guarantee comes from a
+    per-kind file lock held for the duration of the run; the worker holding
+    it publishes the job's progress to a per-kind state file, so the other
+    workers can return and look up that job too.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='regen')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active = {}
+
+    def submit(self, kind):
+        with self._lock:
+            active = self._active.get(kind)
+            if active is not None:
+                return active, False
+            try:
+                lock_file = self._acquire_kind_lock(kind)
+            except JobAlreadyRunning:
+                shared = self._read_state(kind)
+                if shared is None or shared.status not in ACTIVE_STATUSES:
+                    raise
+                return shared, False
+            job = Job(kind)
+            self._active[kind] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOB_HISTORY:
+                self._jobs.popitem(last=False)
+            self._write_state(job)
+        self._pool.submit(self._run, job, lock_file)
+        return job, True
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        # Started by another worker: its latest state is on disk
+        for kind in JOB_COMMANDS:
+            shared = self._read_state(kind)
+            if shared is not None and shared.id == job_id:
+                return shared
+        return None
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def _acquire_kind_lock(self, kind):
+        if fcntl is None:
+            return None
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        lock_file = open(os.path.join(SNAPSHOT_DIR, f'job-{kind}.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise JobAlreadyRunning(kind)
+        return lock_file
+
+    def _state_path(self, kind):
+        return os.path.join(SNAPSHOT_DIR, f'job-{kind}.json')
+
+    def _write_state(self, job):
+        path = self._state_path(job.kind)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(job.to_dict(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not publish {job.kind} job state: {e}")
+
+    def _read_state(self, kind):
+        try:
+            with open(self._state_path(kind)) as f:
+                return SharedJob(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _run(self, job, lock_file):
+        job.status = 'running'
+        job.started_at = time.time()
+        self._write_state(job)
+        try:
+            process = subprocess.Popen(
+                [ML_PYTHON, '-u', *JOB_COMMANDS[job.kind]], cwd=ML_SERVICE_DIR,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+            # Keep reading to EOF whatever the child prints; a reader that
+            # stopped early would leave it blocked on a full pipe
+            for line in process.stdout:
+                line = line.rstrip('\n')
+                try:
+                    if job.handle_line(line):
+                        self._write_state(job)
+                except (ValueError, KeyError) as e:
+                    print(f"Skipping malformed {job.kind} job event ({e}): {line[:200]}")
+                    job.output.append(line)
+            job.returncode = process.wait()
+            job.status = 'succeeded' if job.returncode == 0 else 'failed'
+        except Exception as e:
+            job.output.append(str(e))
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            job.current_stage = None
+            with self._lock:
+                self._active.pop(job.kind, None)
+            self._write_state(job)
+            if lock_file is not None:
+                lock_file.close()
+
+
+job_runner = JobRunner()
@@ -0,0 +1,139 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+from hashing import hasher
+from scoring import worker_stats
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self, name, help_text):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_str = ','.join(f'{k}="{v}"' for k, v in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_str}}} {total}')
+            lines.append(f'{name}_count{{{label_str}}} {cumulative}')
+        return lines
+
+
+class RequestMetrics:
+    """Per-route latency and response size, collected per worker process.
+
+    Each gunicorn worker exposes its own counters; the scraper aggregates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._record)
+        app.add_url_rule('/metrics', 'metrics', self.render_response)
+
+    def _start(self):
+        g.request_started = time.perf_counter()
+
+    def _record(self, response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        # Label by route template, not raw path, to keep cardinality bounded
+        labels = (('endpoint', request.endpoint or 'unmatched'), ('method', request.method),
+                  ('status', str(response.status_code)))
+        size = response.calculate_content_length()
+        if size is None:
+            # send_file sets Content-Length from the file size
+            size = response.content_length
+        with self._lock:
+            self.latency.observe(labels, time.perf_counter() - started)
+            if size is not None:
+                self.size.observe(labels, size)
+        if size is None and response.is_streamed and not response.direct_passthrough:
+            self._count_streamed(response, labels)
+        return response
+
+    def _count_streamed(self, response, labels):
+        # Streamed bodies have no length up front; count the bytes as they
+        # are sent and record the size once the response is closed
+        sent = [0]
+        body = response.iter_encoded()
+
+        def counted():
+            for chunk in body:
+                sent[0] += len(chunk)
+                yield chunk
+
+        def observe():
+            with self._lock:
+                self.size.observe(labels, sent[0])
+
+        response.response = counted()
+        response.call_on_close(observe)
+
+    def render(self):
+        with self._lock:
+            lines = self.latency.render('http_request_duration_seconds', 'Request latency by route.')
+            lines += self.size.render('http_response_size_bytes', 'Response body size by route.')
+        lines += _hasher_lines(hasher.metrics())
+        lines += _worker_lines(worker_stats())
+        return '\n'.join(lines) + '\n'
+
+    def render_response(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _hasher_lines(stats):
+    lines = [
+        '# TYPE password_hash_queue_depth gauge',
+        f'password_hash_queue_depth {stats["queue_depth"]}',
+        '# TYPE password_hash_queue_depth_max gauge',
+        f'password_hash_queue_depth_max {stats["max_queue_depth"]}',
+        '# TYPE password_hash_queue_limit gauge',
+        f'password_hash_queue_limit {stats["queue_limit"]}',
+        '# TYPE password_hash_rejected_total counter',
+        f'password_hash_rejected_total {stats["rejected"]}',
+        '# TYPE password_hash_operations_total counter',
+    ]
+    for op, latency in stats['latency'].items():
+        lines.append(f'password_hash_operations_total{{op="{op}"}} {latency["count"]}')
+    lines.append('# TYPE password_hash_latency_max_seconds gauge')
+    for op, latency in stats['latency'].items():
+        lines.append(f'password_hash_latency_max_seconds{{op="{op}"}} {latency["max_ms"] / 1000}')
+    return lines
+
+
+def _worker_lines(stats):
+    lines = ['# TYPE process_resident_memory_bytes gauge']
+    # anon is private to this worker; file includes the shared, memory-mapped model
+    for kind in ('rss', 'anon', 'file'):
+        if f'{kind}_mb' in stats['memory_mb']:
+            lines.append(f'process_resident_memory_bytes{{kind="{kind}"}} {int(stats["memory_mb"][f"{kind}_mb"] * 1024 * 1024)}')
+    if stats['load_seconds'] is not None:
+        lines.append('# TYPE churn_model_load_seconds gauge')
+        lines.append(f'churn_model_load_seconds{{version="{stats["model_version"]}"}} {stats["load_seconds"]}')
+    return lines
+
+
+request_metrics = RequestMetrics()
@@ -1,4 +1,4 @@
-from app import mongo, bcrypt
+from user_store import get_user_repository
 
 class User:
     def __init__(self, name, email, password):
@@ -7,17 +7,12 @@ class User:
         self.password = password
 
     def save(self):
-        user_data = {
-            'name': self.name,
-            'email': self.email,
-            'password': self.password
-        }
-        mongo.db.users.insert_one(user_data)
+        return get_user_repository().create(self.name, self.email, self.password)
 
     @staticmethod
     def find_by_email(email):
-        return mongo.db.users.find_one({'email': email})
+        return get_user_repository().get_by_email(email)
 
     @staticmethod
     def find_all():
-        return list(mongo.db.users.find({}, {'password': 0}))
+        return get_user_repository().list_users()
@@ -0,0 +1,117 @@
+import base64
+import os
+import threading
+
+import numpy as np
+
+from columnar import arrow_sections
+
+FIELDS = ['customer_id', 'country', 'category', 'segment', 'churn_probability']
+FILTER_FIELDS = ['country', 'category', 'segment']
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class PredictionIndex:
+    """Per-customer churn scores ordered by probability, with secondary indexes.
+
+    Rows are stored sorted by churn_probability (descending), so a row's
+    position is its rank. Each filterable column maps value -> sorted array
+    of positions; filters intersect those arrays and a probability range is
+    a contiguous slice of positions, so a page never scans the whole table.
+    """
+
+    def __init__(self, df, version):
+        # Imported here, not at module level, so worker boot doesn't load pandas
+        import pandas as pd
+
+        df = df.sort_values(['churn_probability', 'customer_id'], ascending=[False, True], kind='stable')
+        self.version = version
+        self.columns = {col: df[col].to_numpy() for col in FIELDS if col in df.columns}
+        self.size = len(df)
+        # Negated so searchsorted works on an ascending array
+        self._neg_prob = -self.columns['churn_probability'].astype(np.float64)
+        self.secondary = {}
+        for col in FILTER_FIELDS:
+            if col not in self.columns:
+                continue
+            codes, uniques = pd.factorize(self.columns[col])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.secondary[col] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+            }
+
+    def _positions(self, filters, min_prob, max_prob):
+        positions = None
+        for col, values in filters.items():
+            index = self.secondary.get(col, {})
+            matches = [index[v] for v in values if v in index]
+            col_positions = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            positions = col_positions if positions is None else np.intersect1d(positions, col_positions,
+                                                                               assume_unique=True)
+        lo = 0 if max_prob is None else np.searchsorted(self._neg_prob, -max_prob, side='left')
+        hi = self.size if min_prob is None else np.searchsorted(self._neg_prob, -min_prob, side='right')
+        if positions is None:
+            return np.arange(lo, hi)
+        return positions[(positions >= lo) & (positions < hi)]
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(f'{self.version}:{position}'.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            version, position = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit(':', 1)
+            position = int(position)
+        except (ValueError, UnicodeDecodeError):
+            raise InvalidCursor('Malformed cursor')
+        if version != str(self.version):
+            raise InvalidCursor('Cursor expired; predictions were republished')
+        return position
+
+    def query(self, filters=None, min_prob=None, max_prob=None, limit=100, cursor=None, top=None, fields=None):
+        positions = self._positions(filters or {}, min_prob, max_prob)
+        total = len(positions)
+        if top is not None:
+            positions = positions[:top]
+        if cursor:
+            positions = positions[np.searchsorted(positions, self.decode_cursor(cursor), side='right'):]
+        page = positions[:limit]
+        fields = [f for f in (fields or FIELDS) if f in self.columns]
+        rows = [
+            {f: _to_json(self.columns[f][p]) for f in fields}
+            for p in page
+        ]
+        next_cursor = self.encode_cursor(int(page[-1])) if len(positions) > limit else None
+        return {'customers': rows, 'total': total, 'next_cursor': next_cursor}
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class PredictionIndexCache:
+    """Rebuilds the index when the pipeline publishes a new scores file."""
+
+    def __init__(self, dataset='churn', section='customerScores'):
+        self.path = arrow_sections.path(dataset, section)
+        self.dataset = dataset
+        self.section = section
+        self._lock = threading.Lock()
+        self._index = None
+
+    def get(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._index is None or self._index.version != mtime:
+            with self._lock:
+                if self._index is None or self._index.version != mtime:
+                    table = arrow_sections.table(self.dataset, self.section)
+                    self._index = PredictionIndex(table.to_pandas(), mtime)
+        return self._index
+
+
+prediction_index = PredictionIndexCache()
@@ -1,17 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from flask_bcrypt import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required
+from user_store import get_user_repository, UserExistsError
+from hashing import hasher, HashQueueFull, HashTimeout
 
 auth_bp = Blueprint('auth', __name__)
 
-# In-memory storage for users (temporary)
-USERS = []
-USER_ID_COUNTER = 1
+def _hashing_busy():
+    # Shed load quickly rather than queueing logins behind a saturated pool
+    response = jsonify({'message': 'Too many authentication requests, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
-    from app import bcrypt
-    global USER_ID_COUNTER, USERS
+    users = get_user_repository()
     try:
         data = request.get_json()
         name = data.get('name')
@@ -22,36 +24,34 @@ def register():
         if not name or not email or not password:
             return jsonify({'message': 'All fields are required'}), 400
 
-        # Check if user exists
-        existing_user = next((u for u in USERS if u['email'] == email), None)
-        if existing_user:
+        # Check if user exists (cheap indexed lookup before paying for bcrypt)
+        if users.get_by_email(email):
             return jsonify({'message': 'User already exists'}), 400
 
         # Hash password
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-
-        # Save user
-        user_id = USER_ID_COUNTER
-        USER_ID_COUNTER += 1
-        user = {
-            '_id': user_id,
-            'name': name,
-            'email': email,
-            'password': hashed_password
-        }
-        USERS.append(user)
+        hashed_password = hasher.hash(password)
+
+        # Save user; the unique email index catches concurrent signups
+        try:
+            user = users.create(name, email, hashed_password)
+        except UserExistsError:
+            return jsonify({'message': 'User already exists'}), 400
+        user_id = user['_id']
 
         # Generate token
         token = create_access_token(identity={'id': str(user_id), 'email': email})
 
         return jsonify({'message': 'User registered successfully', 'token': token}), 201
+    except HashQueueFull:
+        return _hashing_busy()
+    except HashTimeout:
+        return jsonify({'message': 'Authentication timed out'}), 503
     except Exception as e:
         return jsonify({'message': 'Server error'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    from app import bcrypt
-    global USERS
+    users = get_user_repository()
     try:
         data = request.get_json()
         email = data.get('email')
@@ -62,27 +62,42 @@ def login():
             return jsonify({'message': 'Email and password are required'}), 400
 
         # Find user
-        user = next((u for u in USERS if u['email'] == email), None)
+        user = users.get_by_email(email)
         if not user:
             return jsonify({'message': 'Invalid credentials'}), 400
 
         # Check password
-        if not bcrypt.check_password_hash(user['password'], password):
+        if not hasher.check(user['password'], password):
             return jsonify({'message': 'Invalid credentials'}), 400
 
+        # Upgrade hashes made with a different work factor while we know the password
+        if hasher.needs_rehash(user['password']):
+            try:
+                users.update_password(user['_id'], hasher.hash(password))
+            except (HashQueueFull, HashTimeout):
+                pass
+
         # Generate token
         token = create_access_token(identity={'id': str(user['_id']), 'email': user['email']})
 
         return jsonify({'message': 'Login successful', 'token': token})
+    except HashQueueFull:
+        return _hashing_busy()
+    except HashTimeout:
+        return jsonify({'message': 'Authentication timed out'}), 503
     except Exception as e:
         return jsonify({'message': 'Server error'}), 500
 
 @auth_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
-    global USERS
     try:
-        users = [{'_id': str(u['_id']), 'name': u['name'], 'email': u['email']} for u in USERS]
+        users = [{'_id': str(u['_id']), 'name': u['name'], 'email': u['email']}
+                 for u in get_user_repository().list_users()]
         return jsonify({'users': users})
     except Exception as e:
         return jsonify({'message': 'Server error'}), 500
+
+@auth_bp.route('/metrics', methods=['GET'])
+def get_hash_metrics():
+    return jsonify(hasher.metrics())
@@ -1,22 +1,29 @@
 from flask import Blueprint, jsonify, request
-import json
+from flask_jwt_extended import jwt_required
 import os
+from data_cache import DatasetCache, cached_response
+from columnar import section_response
+from streaming import UnknownSection, requested_sections, stream_response, wants_ndjson
+from scoring import get_batcher, model_registry, worker_stats
+from prediction_index import prediction_index, InvalidCursor, FILTER_FIELDS
 
 churn_bp = Blueprint('churn', __name__)
 
-# In-memory storage for churn data
-churn_data_store = None
+# Serialized churn data, refreshed when the JSON file changes or any worker receives a POST
+CHURN_JSON_PATH = os.getenv('CHURN_JSON_PATH', os.path.join(os.path.dirname(__file__), '../../ml-service/data/churn_predictions.json'))
+churn_cache = DatasetCache(CHURN_JSON_PATH, 'churn')
 
 @churn_bp.route('/churn', methods=['GET'])
 def get_churn_data():
-    if churn_data_store:
-        return jsonify(churn_data_store)
     try:
-        # Path to churn_predictions.json in ml-service
-        json_path = os.path.join(os.path.dirname(__file__), '../../ml-service/data/churn_predictions.json')
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
+        entry = churn_cache.get()
+        # ?sections=a,b and NDJSON are streamed; the full JSON body is served pre-encoded
+        sections, ndjson = requested_sections(entry.data), wants_ndjson()
+        if sections is None and not ndjson:
+            return cached_response(entry)
+        return stream_response(entry, sections, ndjson=ndjson)
+    except UnknownSection as e:
+        return jsonify({'message': e.args[0]}), 400
     except FileNotFoundError:
         return jsonify({'message': 'Churn data not found'}), 404
     except Exception as e:
@@ -24,7 +31,103 @@ def get_churn_data():
 
 @churn_bp.route('/churn', methods=['POST'])
 def update_churn_data():
-    global churn_data_store
     data = request.get_json()
-    churn_data_store = data
+    churn_cache.publish(data)
     return jsonify({'status': 'Churn data updated successfully'})
+
+MAX_PAGE_SIZE = 1000
+
+def _csv_arg(name):
+    value = request.args.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+@churn_bp.route('/churn/customers', methods=['GET'])
+def query_customers():
+    try:
+        index = prediction_index.get()
+    except FileNotFoundError:
+        return jsonify({'message': 'Customer scores not found. Run generate_churn_data.py first.'}), 404
+
+    try:
+        min_prob = request.args.get('min_prob', type=float)
+        max_prob = request.args.get('max_prob', type=float)
+        limit = max(1, min(request.args.get('limit', 100, type=int), MAX_PAGE_SIZE))
+        top = request.args.get('top', type=int)
+        if top is not None:
+            if top < 0:
+                return jsonify({'message': 'top must be a non-negative integer'}), 400
+            top = min(top, MAX_PAGE_SIZE)
+        filters = {col: _csv_arg(col) for col in FILTER_FIELDS if _csv_arg(col)}
+        result = index.query(filters, min_prob=min_prob, max_prob=max_prob, limit=limit,
+                             cursor=request.args.get('cursor'), top=top, fields=_csv_arg('fields'))
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(result)
+
+@churn_bp.route('/churn/score', methods=['POST'])
+def score_customers():
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'message': 'JSON body required'}), 400
+    # Accept a single customer, a list, or {"customers": [...]}
+    customers = data.get('customers', data) if isinstance(data, dict) else data
+    single = isinstance(customers, dict)
+    if single:
+        customers = [customers]
+    if not isinstance(customers, list) or not all(isinstance(c, dict) for c in customers):
+        return jsonify({'message': 'Expected a customer object, a list of them, or {"customers": [...]}'}), 400
+    if not customers:
+        return jsonify({'message': 'No customers to score'}), 400
+    batcher = get_batcher()
+    if batcher is None:
+        return jsonify({'message': 'Churn model not loaded'}), 503
+    bundle = batcher.refresh()
+    try:
+        X = bundle.prepare(customers)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    try:
+        scores = batcher.submit(bundle, X).result()
+    except Exception as e:
+        return jsonify({'message': 'Server error'}), 500
+
+    results = [
+        {'customer_id': c.get('customer_id'), 'churn_probability': float(p)}
+        for c, p in zip(customers, scores)
+    ]
+    if single:
+        return jsonify({**results[0], 'model_version': bundle.version})
+    return jsonify({'predictions': results, 'model_version': bundle.version})
+
+@churn_bp.route('/churn/model', methods=['GET'])
+def get_model_info():
+    batcher = get_batcher()
+    return jsonify({
+        'current': batcher.bundle.metadata if batcher else None,
+        'versions': model_registry.list_versions(),
+        'worker': worker_stats(),
+    })
+
+@churn_bp.route('/churn/model', methods=['POST'])
+@jwt_required()
+def swap_model():
+    batcher = get_batcher()
+    if batcher is None:
+        return jsonify({'message': 'Churn model not loaded'}), 503
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if version not in model_registry.list_versions():
+        return jsonify({'message': f'Unknown model version: {version}'}), 400
+    # Load first: CURRENT only moves once this worker has the version in
+    # memory, so a broken version never becomes every worker's model
+    try:
+        bundle = batcher.swap(version)
+    except Exception as e:
+        return jsonify({'message': f'Model version {version} failed to load: {e}'}), 422
+    model_registry.set_current(version)
+    return jsonify({'status': 'Model swapped successfully', 'current': bundle.metadata})
+
+@churn_bp.route('/churn/sections/<section>', methods=['GET'])
+def get_churn_section(section):
+    # Send "Accept: application/vnd.apache.arrow.file" (or .stream) for Arrow IPC
+    return section_response('churn', section)
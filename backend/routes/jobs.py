@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from jobs import job_runner, JobAlreadyRunning, JOB_COMMANDS
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<kind>', methods=['POST'])
+@jwt_required()
+def trigger_job(kind):
+    if kind not in JOB_COMMANDS:
+        return jsonify({'message': f'Unknown job kind: {kind}'}), 404
+    try:
+        job, created = job_runner.submit(kind)
+    except JobAlreadyRunning:
+        # Another worker holds the lock but hasn't published its job yet
+        return jsonify({'message': f'A {kind} regeneration is already running on another worker'}), 409
+    # Concurrent triggers, on any worker, get the job that is already queued or running
+    return jsonify(job.to_dict()), 202 if created else 200
+
+@jobs_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    return jsonify({'jobs': [job.to_dict() for job in job_runner.list()]})
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(job.to_dict())
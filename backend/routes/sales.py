@@ -1,22 +1,26 @@
 from flask import Blueprint, jsonify, request
-import json
 import os
+from data_cache import DatasetCache, cached_response
+from columnar import section_response
+from streaming import UnknownSection, requested_sections, stream_response, wants_ndjson
 
 sales_bp = Blueprint('sales', __name__)
 
-# In-memory storage for sales data
-sales_data_store = None
+# Serialized sales data, refreshed when the JSON file changes or any worker receives a POST
+SALES_JSON_PATH = os.getenv('SALES_JSON_PATH', os.path.join(os.path.dirname(__file__), '../../ml-service/data/sales_data.json'))
+sales_cache = DatasetCache(SALES_JSON_PATH, 'sales')
 
 @sales_bp.route('/sales', methods=['GET'])
 def get_sales_data():
-    if sales_data_store:
-        return jsonify(sales_data_store)
     try:
-        # Path to the sales data file (adjust relative to backend)
-        data_path = os.path.join(os.path.dirname(__file__), '../../ml-service/data/sales_data.json')
-        with open(data_path, 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
+        entry = sales_cache.get()
+        # ?sections=a,b and NDJSON are streamed; the full JSON body is served pre-encoded
+        sections, ndjson = requested_sections(entry.data), wants_ndjson()
+        if sections is None and not ndjson:
+            return cached_response(entry)
+        return stream_response(entry, sections, ndjson=ndjson)
+    except UnknownSection as e:
+        return jsonify({'error': e.args[0]}), 400
     except FileNotFoundError:
         return jsonify({'error': 'Sales data not found. Run generate_sales_data.py first.'}), 404
     except Exception as e:
@@ -24,7 +28,11 @@ def get_sales_data():
 
 @sales_bp.route('/sales', methods=['POST'])
 def update_sales_data():
-    global sales_data_store
     data = request.get_json()
-    sales_data_store = data
+    sales_cache.publish(data)
     return jsonify({'status': 'Sales data updated successfully'})
+
+@sales_bp.route('/sales/sections/<section>', methods=['GET'])
+def get_sales_section(section):
+    # Send "Accept: application/vnd.apache.arrow.file" (or .stream) for Arrow IPC
+    return section_response('sales', section)
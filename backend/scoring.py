@@ -0,0 +1,144 @@
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# The model registry lives in ml-service/, next to the scripts that train it
+ML_SERVICE_DIR = os.getenv('ML_SERVICE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '../ml-service'))
+if ML_SERVICE_DIR not in sys.path:
+    sys.path.insert(0, ML_SERVICE_DIR)
+
+import model_registry  # noqa: E402
+from stages import process_memory_mb  # noqa: E402
+
+# Micro-batching knobs: requests that arrive within MAX_WAIT_MS of each other
+# are scored together in one predict_proba call
+MAX_BATCH_ROWS = int(os.getenv('SCORE_MAX_BATCH_ROWS', '20000'))
+MAX_WAIT_MS = float(os.getenv('SCORE_MAX_WAIT_MS', '5'))
+
+
+class MicroBatcher:
+    def __init__(self, bundle, max_batch_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS):
+        self.bundle = bundle
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._swap_lock = threading.Lock()
+        self._current_mtime = model_registry.current_version_mtime()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def swap(self, version):
+        bundle = model_registry.load_model(version)
+        with self._swap_lock:
+            self.bundle = bundle
+        return bundle
+
+    def refresh(self):
+        # A cheap stat of models/CURRENT; other workers that switched the
+        # version are picked up here without any coordination
+        mtime = model_registry.current_version_mtime()
+        if mtime == self._current_mtime:
+            return self.bundle
+        with self._swap_lock:
+            if mtime != self._current_mtime:
+                self._current_mtime = mtime
+                version = model_registry.current_version()
+                if version and version != self.bundle.version:
+                    self.bundle = model_registry.load_model(version)
+        return self.bundle
+
+    def submit(self, bundle, X):
+        # X must have been prepared by the same bundle that scores it
+        future = Future()
+        self._queue.put((bundle, X, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _score(self, bundle, items):
+        try:
+            # Prepared rows are float32 matrices with the same column layout
+            X = np.concatenate([X for _, X, _ in items])
+            scores = (bundle.predict_proba(X) * 100).round(2)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        start = 0
+        for _, X, future in items:
+            future.set_result(scores[start:start + len(X)])
+            start += len(X)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Requests straddling a model swap are scored per version
+            by_bundle = {}
+            for item in batch:
+                by_bundle.setdefault(id(item[0]), []).append(item)
+            for items in by_bundle.values():
+                self._score(items[0][0], items)
+
+
+_batcher = None
+_init_lock = threading.Lock()
+
+# Set SCORER_PRELOAD=0 to load the model only when the first request needs it
+SCORER_PRELOAD = os.getenv('SCORER_PRELOAD', '1') != '0'
+
+
+def init_scorer():
+    global _batcher
+    with _init_lock:
+        if _batcher is not None:
+            return _batcher
+        try:
+            _batcher = MicroBatcher(model_registry.load_model())
+        except FileNotFoundError as e:
+            print(f"{e}; /api/churn/score disabled")
+            _batcher = None
+    return _batcher
+
+
+def warm_scorer():
+    # Unpickling the model pulls in scikit-learn; loading it off the import
+    # path keeps worker boot fast. Early requests wait on _init_lock.
+    if SCORER_PRELOAD:
+        threading.Thread(target=init_scorer, name='scorer-warmup', daemon=True).start()
+
+
+def get_batcher():
+    # Picks up a model registered after the server started
+    if _batcher is None and model_registry.current_version():
+        return init_scorer()
+    return _batcher
+
+
+def worker_stats():
+    """Model load time and resident memory of this worker process."""
+    bundle = _batcher.bundle if _batcher else None
+    return {
+        'pid': os.getpid(),
+        'model_version': bundle.version if bundle else None,
+        'load_seconds': bundle.load_seconds if bundle else None,
+        'memory_mb': process_memory_mb(),
+    }
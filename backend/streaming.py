@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import zlib
+
+from flask import Response, request
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Records serialized per chunk; bounds the bytes built per write, not the payload
+CHUNK_RECORDS = int(os.getenv('STREAM_CHUNK_RECORDS', '500'))
+
+
+class UnknownSection(KeyError):
+    pass
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def requested_sections(data):
+    """Section names from ?sections=a,b in request order, or None for all.
+
+    Raises UnknownSection naming any the payload doesn't have.
+    """
+    value = request.args.get('sections')
+    if not value:
+        return None
+    names = list(dict.fromkeys(v.strip() for v in value.split(',') if v.strip()))
+    unknown = [name for name in names if name not in data]
+    if unknown:
+        raise UnknownSection(f"Unknown sections: {', '.join(unknown)}. Available: {', '.join(data)}")
+    return names
+
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE], default='application/json')
+    return best == NDJSON_MIMETYPE
+
+
+def _batches(records):
+    for start in range(0, len(records), CHUNK_RECORDS):
+        yield records[start:start + CHUNK_RECORDS]
+
+
+def json_chunks(data, sections):
+    """The selected sections as one JSON object, a few records at a time."""
+    yield '{'
+    for i, name in enumerate(sections):
+        value = data[name]
+        prefix = (',' if i else '') + _dumps(name) + ':'
+        if not isinstance(value, list):
+            yield prefix + _dumps(value)
+            continue
+        yield prefix + '['
+        for j, batch in enumerate(_batches(value)):
+            yield (',' if j else '') + ','.join(_dumps(record) for record in batch)
+        yield ']'
+    yield '}'
+
+
+def ndjson_chunks(data, sections):
+    """One line per record: {"section": ..., "record": ...}.
+
+    Sections that aren't lists are sent as a single {"section", "value"} line.
+    """
+    for name in sections:
+        value = data[name]
+        if not isinstance(value, list):
+            yield _dumps({'section': name, 'value': value}) + '\n'
+            continue
+        for batch in _batches(value):
+            yield ''.join(_dumps({'section': name, 'record': record}) + '\n' for record in batch)
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_response(entry, sections=None, ndjson=False):
+    """Stream entry.data (or the named sections) without building the body.
+
+    Records are serialized from the already-parsed payload as the client
+    reads, so memory per request stays at one chunk however large the
+    payload or how many exports run at once. The ETag is derived from the
+    payload's, so conditional requests still get a 304 without any work.
+    """
+    sections = list(entry.data) if sections is None else sections
+    gzipped = bool(request.accept_encodings['gzip'])
+    variant = f"{entry.etag}:{'ndjson' if ndjson else 'json'}:{','.join(sections)}:{'gzip' if gzipped else 'identity'}"
+    etag = hashlib.sha1(variant.encode('utf-8')).hexdigest()
+    mimetype = NDJSON_MIMETYPE if ndjson else 'application/json'
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        chunks = (ndjson_chunks if ndjson else json_chunks)(entry.data, sections)
+        if gzipped:
+            response = Response(_gzip_chunks(chunks), mimetype=mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response((chunk.encode('utf-8') for chunk in chunks), mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = entry.last_modified
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager
+
+from routes import churn
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test'
+    JWTManager(app)
+    app.register_blueprint(churn.churn_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('body', [5, 'CUST1', ['CUST1', 'CUST2'], {'customers': 'CUST1'}, [{'age': 30}, 7]])
+def test_score_rejects_non_object_customers(client, body):
+    response = client.post('/api/churn/score', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'Expected a customer object, a list of them, or {"customers": [...]}'}
+
+
+@pytest.mark.parametrize('body', [[], {'customers': []}])
+def test_score_rejects_empty_lists(client, body):
+    response = client.post('/api/churn/score', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'No customers to score'}
+
+
+class _RecordingIndex:
+    def __init__(self):
+        self.calls = []
+
+    def query(self, filters, **kwargs):
+        self.calls.append(kwargs)
+        return {'customers': []}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = _RecordingIndex()
+    monkeypatch.setattr(churn.prediction_index, 'get', lambda: index)
+    return index
+
+
+def test_query_rejects_negative_top(client, index):
+    response = client.get('/api/churn/customers?top=-1')
+    assert response.status_code == 400
+    assert index.calls == []
+
+
+def test_query_clamps_top_to_page_size(client, index):
+    assert client.get(f'/api/churn/customers?top={churn.MAX_PAGE_SIZE + 5}').status_code == 200
+    assert client.get('/api/churn/customers?top=0').status_code == 200
+    assert [call['top'] for call in index.calls] == [churn.MAX_PAGE_SIZE, 0]
@@ -0,0 +1,41 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+import data_cache
+from data_cache import DatasetCache, cached_response
+from snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatasetCache(str(tmp_path / 'missing.json'), 'churn', SnapshotStore(['churn'], directory=str(tmp_path)))
+
+
+def test_publish_compresses_once(cache, monkeypatch):
+    calls, compress = [], gzip.compress
+    monkeypatch.setattr(data_cache.gzip, 'compress', lambda body, **kw: calls.append(body) or compress(body, **kw))
+
+    entry = cache.publish({'customers': [1, 2, 3]})
+
+    assert len(calls) == 1
+    assert entry.data == {'customers': [1, 2, 3]}
+    assert cache.get() is entry
+
+
+def test_etag_differs_per_encoding(cache):
+    entry = cache.publish({'customers': [1, 2, 3]})
+    app = Flask(__name__)
+
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        gzipped = cached_response(entry)
+    with app.test_request_context():
+        identity = cached_response(entry)
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.get_etag()[0] != identity.get_etag()[0]
+
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{gzipped.get_etag()[0]}"'}):
+        assert cached_response(entry).status_code == 304
+    with app.test_request_context(headers={'If-None-Match': f'"{gzipped.get_etag()[0]}"'}):
+        assert cached_response(entry).status_code == 200
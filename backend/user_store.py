@@ -0,0 +1,131 @@
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+USER_STORE = os.getenv('USER_STORE', 'sqlite')
+USER_DB_PATH = os.getenv('USER_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db'))
+USER_DB_POOL_SIZE = int(os.getenv('USER_DB_POOL_SIZE', '4'))
+
+
+class UserExistsError(Exception):
+    pass
+
+
+class InMemoryUserRepository:
+    """Dict keyed by email; fine for development, lost on restart."""
+
+    def __init__(self):
+        self._by_email = {}
+        self._by_id = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, name, email, password):
+        with self._lock:
+            if email in self._by_email:
+                raise UserExistsError(email)
+            user = {'_id': next(self._ids), 'name': name, 'email': email, 'password': password}
+            self._by_email[email] = user
+            self._by_id[user['_id']] = user
+        return dict(user)
+
+    def get_by_email(self, email):
+        user = self._by_email.get(email)
+        return dict(user) if user else None
+
+    def get_by_id(self, user_id):
+        user = self._by_id.get(int(user_id))
+        return dict(user) if user else None
+
+    def update_password(self, user_id, password):
+        with self._lock:
+            self._by_id[int(user_id)]['password'] = password
+
+    def list_users(self):
+        return [{'_id': u['_id'], 'name': u['name'], 'email': u['email']} for u in list(self._by_id.values())]
+
+
+class SQLiteUserRepository:
+    """Durable store shared by every gunicorn worker on the host.
+
+    WAL mode lets readers proceed while a signup is being written, the
+    UNIQUE email index makes lookups O(log n) and duplicate signups fail
+    atomically, and AUTOINCREMENT hands out ids without a shared counter.
+    """
+
+    def __init__(self, path=USER_DB_PATH, pool_size=USER_DB_POOL_SIZE):
+        self.path = path
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    _id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    email TEXT NOT NULL UNIQUE,
+                    password TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def create(self, name, email, password):
+        with self._connection() as conn:
+            try:
+                cursor = conn.execute('INSERT INTO users (name, email, password) VALUES (?, ?, ?)',
+                                      (name, email, password))
+            except sqlite3.IntegrityError:
+                raise UserExistsError(email)
+        return {'_id': cursor.lastrowid, 'name': name, 'email': email, 'password': password}
+
+    def get_by_email(self, email):
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return dict(row) if row else None
+
+    def get_by_id(self, user_id):
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE _id = ?', (int(user_id),)).fetchone()
+        return dict(row) if row else None
+
+    def update_password(self, user_id, password):
+        with self._connection() as conn:
+            conn.execute('UPDATE users SET password = ? WHERE _id = ?', (password, int(user_id)))
+
+    def list_users(self):
+        with self._connection() as conn:
+            rows = conn.execute('SELECT _id, name, email FROM users ORDER BY _id').fetchall()
+        return [dict(row) for row in rows]
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_user_repository():
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                if USER_STORE == 'memory':
+                    _repository = InMemoryUserRepository()
+                else:
+                    _repository = SQLiteUserRepository()
+    return _repository
@@ -0,0 +1,78 @@
+import argparse
+import json
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_store import load_features
+from model_registry import current_version, load_model
+from stages import process_memory_mb
+
+
+def load_in_worker(version, mmap, n_rows):
+    # Loaded first so the baseline already includes pandas and the data
+    customers = load_features().head(n_rows)
+    before = process_memory_mb()
+    bundle = load_model(version, mmap=mmap)
+    after_load = process_memory_mb()
+    # Scoring touches every tree, so mapped pages are resident afterwards
+    X = bundle.prepare(customers)
+    start = time.perf_counter()
+    bundle.predict_proba(X)
+    predict_seconds = time.perf_counter() - start
+    after_score = process_memory_mb()
+    return {
+        'mmap': mmap,
+        'load_seconds': bundle.load_seconds,
+        'predict_ms': round(predict_seconds * 1000, 2),
+        'rss_mb': after_score.get('rss_mb'),
+        # Private memory added by the model; file-backed pages are shared
+        'model_anon_mb': round(after_score.get('anon_mb', np.nan) - before.get('anon_mb', np.nan), 1),
+        'model_file_mb': round(after_score.get('file_mb', np.nan) - before.get('file_mb', np.nan), 1),
+        'load_anon_mb': round(after_load.get('anon_mb', np.nan) - before.get('anon_mb', np.nan), 1),
+    }
+
+
+def _report(results, version, mmap, n_rows):
+    results.put(load_in_worker(version, mmap, n_rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model load time and resident memory per worker process')
+    parser.add_argument('--version', default=None, help='registered model version (default: CURRENT)')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes loading the model at once')
+    parser.add_argument('--rows', type=int, default=100, help='customers scored by each worker after loading')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+    version = args.version or current_version()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for mmap in (True, False):
+        # One fresh process per worker, started together as gunicorn would
+        queue = ctx.Queue()
+        workers = [ctx.Process(target=_report, args=(queue, version, mmap, args.rows))
+                   for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        runs = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for worker, run in enumerate(runs):
+            run['worker'] = worker
+            print(run)
+        private = sum(run['model_anon_mb'] for run in runs)
+        print(f"mmap={mmap}: {pd.Series([r['load_seconds'] for r in runs]).median():.3f}s median load, "
+              f"{private:.1f} MB private model memory across {args.workers} workers")
+        results.extend(runs)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'version': version, 'runs': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ML_SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ML_SERVICE_DIR, '..', 'backend')
+
+# Must only be imported by the stages/requests that use them
+HEAVY_MODULES = ['prophet', 'cmdstanpy', 'sklearn', 'pandas', 'pyarrow']
+
+# Imports the module in a fresh interpreter and reports how long that took
+# and which heavy modules it dragged in
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+# eager lists what a target is allowed to load at import; whatever importing
+# those alone pulls in (pandas loads pyarrow when it is installed) is
+# reported as eager_modules instead of failing the check
+TARGETS = {
+    'cli': {'module': 'generate_churn_data', 'cwd': ML_SERVICE_DIR, 'eager': ['pandas']},
+    # The scorer warm-up thread would race the module check
+    'app': {'module': 'app', 'cwd': BACKEND_DIR, 'env': {'SCORER_PRELOAD': '0'}},
+}
+
+
+def eager_modules(target):
+    """Heavy modules that importing the target's eager modules alone brings in."""
+    return {m for module in target.get('eager', [])
+            for m in time_import(module, target['cwd'], target.get('env'))['heavy']}
+
+
+def time_import(module, cwd, env=None):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=cwd, env={**os.environ, **(env or {})}, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_target(name, repeat):
+    target = TARGETS[name]
+    runs = [time_import(target['module'], target['cwd'], target.get('env')) for _ in range(repeat)]
+    seconds = [run['seconds'] for run in runs]
+    heavy = {m for run in runs for m in run['heavy']}
+    eager = eager_modules(target)
+    return {
+        'target': name,
+        'module': target['module'],
+        'median_seconds': round(statistics.median(seconds), 4),
+        'max_seconds': round(max(seconds), 4),
+        'eager_modules': sorted(heavy & eager),
+        'heavy_modules': sorted(heavy - eager),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Cold-start import time of the churn CLI and the Flask app; exits 1 on a regression')
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per target')
+    parser.add_argument('--max-cli-seconds', type=float, default=1.5)
+    parser.add_argument('--max-app-seconds', type=float, default=1.5)
+    parser.add_argument('--output', default=None, help='also write the results as JSON to this path')
+    args = parser.parse_args()
+
+    limits = {'cli': args.max_cli_seconds, 'app': args.max_app_seconds}
+    results, failures = [], []
+    for name in args.targets:
+        result = run_target(name, args.repeat)
+        result['limit_seconds'] = limits[name]
+        results.append(result)
+        print(json.dumps(result))
+        if result['median_seconds'] > limits[name]:
+            failures.append(f"{name}: median import {result['median_seconds']}s exceeds {limits[name]}s")
+        if result['heavy_modules']:
+            failures.append(f"{name}: imports {', '.join(result['heavy_modules'])} at startup")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
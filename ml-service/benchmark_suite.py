@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from stages import EVENT_PREFIX, peak_rss_mb
+from synthetic_data import SyntheticOrders
+
+ML_SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ML_SERVICE_DIR, '..', 'backend')
+
+# Run in order inside a scratch directory holding data/dataset.csv, so the
+# relative data/ paths of each script resolve there instead of ml-service/
+PIPELINE = [
+    ('feature_store', ['feature_store.py']),
+    ('churn_model', ['churn_model.py']),
+    ('generate_churn_data', ['generate_churn_data.py']),
+    ('generate_sales_data', ['generate_sales_data.py', '--no-post']),
+]
+
+BENCH_USER = {'name': 'Benchmark', 'email': 'bench@example.com', 'password': 'benchmark-password'}
+
+
+def _scratch_env(workdir):
+    return {
+        **os.environ,
+        'MODEL_REGISTRY_DIR': os.path.join(workdir, 'models'),
+        'PYTHONWARNINGS': 'ignore',
+    }
+
+
+def run_script(name, command, workdir, n_rows):
+    """Run one pipeline script and collect its stage events."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-u', os.path.join(ML_SERVICE_DIR, command[0]), *command[1:]],
+        cwd=workdir, env=_scratch_env(workdir), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    stages, measurements, tail = {}, [], []
+    for line in process.stdout:
+        line = line.rstrip('\n')
+        if not line.startswith(EVENT_PREFIX):
+            tail = (tail + [line])[-20:]
+            continue
+        event = json.loads(line[len(EVENT_PREFIX):])
+        fields = {k: v for k, v in event.items() if k not in ('stage', 'event')}
+        if event['event'] == 'end':
+            stages[event['stage']] = fields
+        elif event['event'] == 'measure':
+            measurements.append({'name': event['stage'], **fields})
+    returncode = process.wait()
+    seconds = time.perf_counter() - start
+    peaks = [s.get('peak_rss_mb') for s in [*stages.values(), *measurements] if s.get('peak_rss_mb')]
+    result = {
+        'script': name,
+        'returncode': returncode,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(n_rows / seconds) if seconds else None,
+        'peak_rss_mb': max(peaks) if peaks else None,
+        'stages': stages,
+        'measurements': measurements,
+    }
+    if returncode != 0:
+        result['output'] = tail
+    return result
+
+
+def _percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 2) if latencies else None
+
+
+def replay(client_factory, method, path, n_requests, concurrency, json_body=None, headers=None):
+    """Send n_requests through concurrency threads, each with its own test client."""
+    latencies, statuses, sizes = [], {}, []
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        client = client_factory()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=json_body, headers=headers)
+            elapsed = time.perf_counter() - start
+            body = response.get_data()
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                sizes.append(len(body))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    seconds = time.perf_counter() - start
+    return {
+        'method': method,
+        'path': path,
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(n_requests / seconds, 1) if seconds else None,
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        'mean_bytes': round(float(np.mean(sizes))) if sizes else None,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_load(workdir, n_requests, concurrency, login_requests):
+    """Replay concurrent requests against the Flask app serving workdir's outputs."""
+    data_dir = os.path.join(workdir, 'data')
+    # Must be set before the backend modules read them at import
+    os.environ.update({
+        'CHURN_JSON_PATH': os.path.join(data_dir, 'churn_predictions.json'),
+        'SALES_JSON_PATH': os.path.join(data_dir, 'sales_data.json'),
+        'ARROW_DIR': os.path.join(data_dir, 'arrow'),
+        'MODEL_REGISTRY_DIR': os.path.join(workdir, 'models'),
+        'SNAPSHOT_DIR': os.path.join(workdir, 'snapshots'),
+        'USER_DB_PATH': os.path.join(workdir, 'users.db'),
+        'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'benchmark-secret'),
+        'SCORER_PRELOAD': '0',
+    })
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+    from app import app
+
+    client = app.test_client()
+    client.post('/api/auth/register', json=BENCH_USER)
+    login = {'email': BENCH_USER['email'], 'password': BENCH_USER['password']}
+    # Conditional GETs exercise the 304 path a polling dashboard hits
+    etag = client.get('/api/churn').headers.get('ETag')
+    gzip = {'Accept-Encoding': 'gzip'}
+    scenarios = [
+        ('GET /api/churn', 'GET', '/api/churn', n_requests, None, gzip),
+        ('GET /api/churn (If-None-Match)', 'GET', '/api/churn', n_requests, None, {'If-None-Match': etag or ''}),
+        ('GET /api/sales', 'GET', '/api/sales', n_requests, None, gzip),
+        ('POST /api/auth/login', 'POST', '/api/auth/login', login_requests, login, None),
+    ]
+    results = []
+    for name, method, path, count, body, headers in scenarios:
+        result = {'name': name, **replay(app.test_client, method, path, count, concurrency, body, headers)}
+        print(json.dumps(result))
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic dataset, run the ML pipeline on it and replay load against the backend')
+    parser.add_argument('--rows', type=int, default=10_000, help='synthetic orders (10^4 to 10^7)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', default=None, help='last synthetic order date (default: today)')
+    parser.add_argument('--scripts', nargs='+', choices=[name for name, _ in PIPELINE],
+                        default=[name for name, _ in PIPELINE], help='pipeline scripts to run')
+    parser.add_argument('--skip-load', action='store_true', help='only run the pipeline')
+    parser.add_argument('--requests', type=int, default=500, help='requests per data endpoint')
+    parser.add_argument('--login-requests', type=int, default=50, help='bcrypt makes logins far slower')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workdir', default=None, help='keep outputs here instead of a temporary directory')
+    parser.add_argument('--output', default='benchmark_report.json')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='churn-bench-')
+    report = {
+        'rows': args.rows,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    try:
+        start = time.perf_counter()
+        generator = SyntheticOrders(args.rows, seed=args.seed, end_date=args.end_date)
+        generator.write_csv(os.path.join(workdir, 'data', 'dataset.csv'))
+        report['generate'] = {'seconds': round(time.perf_counter() - start, 3),
+                              'customers': len(generator.customers), 'products': len(generator.products)}
+        print(f"Generated {args.rows} orders in {workdir}")
+
+        report['pipeline'] = []
+        for name, command in PIPELINE:
+            if name not in args.scripts:
+                continue
+            result = run_script(name, command, workdir, args.rows)
+            print(json.dumps({k: v for k, v in result.items() if k not in ('stages', 'measurements')}))
+            report['pipeline'].append(result)
+            if result['returncode'] != 0:
+                print(f"{name} failed; later scripts depend on its outputs, stopping the pipeline")
+                break
+
+        if not args.skip_load:
+            report['load'] = run_load(workdir, args.requests, args.concurrency, args.login_requests)
+            # Of this process, which hosted the app during the replay
+            report['load_peak_rss_mb'] = peak_rss_mb()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
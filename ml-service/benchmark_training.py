@@ -0,0 +1,92 @@
+import argparse
+import json
+import multiprocessing
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from feature_store import add_recency_features, load_features
+from stages import peak_rss_mb
+from training import FEATURES, NUMERIC_COLS, evaluate, fit_forest, fit_preprocessing, label_churn
+
+# Integer columns are jittered and rounded so the synthetic rows keep their dtypes
+INTEGER_COLS = ['age', 'cancellations_count', 'quantity', 'purchase_frequency']
+
+
+def scale_up(base, n_rows, seed=42):
+    """Resample the real customers to n_rows with small numeric jitter."""
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), size=n_rows)].reset_index(drop=True)
+    for col in NUMERIC_COLS:
+        if col.startswith('days_since'):
+            # Derived from the shifted dates below
+            continue
+        noise = rng.normal(1.0, 0.05, size=n_rows)
+        df[col] = df[col] * noise
+        if col in INTEGER_COLS:
+            df[col] = df[col].round().clip(lower=0)
+    shift = pd.to_timedelta(rng.integers(-30, 30, size=n_rows), unit='D')
+    df['last_purchase_date'] = df['last_purchase_date'] + shift
+    df['signup_date'] = df['signup_date'] + shift
+    df['customer_id'] = [f'SYN{i}' for i in range(n_rows)]
+    return df
+
+
+def run_case(n_rows, n_jobs, n_estimators, seed):
+    df = add_recency_features(scale_up(load_features(), n_rows, seed), datetime.now())
+    y = label_churn(df)
+    df_train, df_test, y_train, y_test = train_test_split(df, y, test_size=0.2, random_state=seed)
+    X_train, preprocessor = fit_preprocessing(df_train)
+    X_test = preprocessor.transform(df_test[FEATURES])
+    X = preprocessor.transform(df[FEATURES])
+
+    start = time.perf_counter()
+    model = fit_forest(X_train, y_train, n_estimators=n_estimators, n_jobs=n_jobs)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    predict_seconds = time.perf_counter() - start
+
+    metrics = evaluate(model, X_test, y_test)
+    return {
+        'rows': n_rows,
+        'n_jobs': n_jobs,
+        'n_estimators': n_estimators,
+        'fit_seconds': round(fit_seconds, 3),
+        'predict_rows_per_sec': round(len(X) / predict_seconds),
+        'peak_rss_mb': peak_rss_mb(),
+        'roc_auc': metrics.get('roc_auc'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark churn RandomForest training at several dataset sizes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 20000, 200000])
+    parser.add_argument('--n-jobs', type=int, nargs='+', default=[1, -1])
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    # Each case runs in a fresh process so peak RSS isn't inherited from earlier cases
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for n_rows in args.sizes:
+        for n_jobs in args.n_jobs:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_case, (n_rows, n_jobs, args.n_estimators, args.seed))
+            print(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
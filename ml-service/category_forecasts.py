@@ -0,0 +1,110 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from stages import measure
+
+# Fitted models and their forecasts, one file per category named by a hash
+# of the category and of its monthly history
+CACHE_DIR = 'data/forecast_cache'
+OUTPUT_DIR = 'inventory_forecasts'
+PROPHET_PARAMS = {'changepoint_prior_scale': 0.01, 'weekly_seasonality': False, 'yearly_seasonality': True}
+PERIODS = 12
+
+
+def series_key(hist, params=PROPHET_PARAMS, periods=PERIODS):
+    h = hashlib.sha256()
+    h.update(json.dumps([params, periods], sort_keys=True).encode())
+    h.update(hist['ds'].astype('int64').to_numpy().tobytes())
+    h.update(hist['y'].astype('float64').to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _fit_category(category, hist):
+    # Runs in a worker process; Prophet is imported here so the parent
+    # doesn't pay for it when every category is a cache hit
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    m = Prophet(**PROPHET_PARAMS)
+    with measure(f'prophet_fit:{category}'):
+        m.fit(hist)
+
+    # Forecast next 12 months
+    future = m.make_future_dataframe(periods=PERIODS, freq='M')
+    forecast = m.predict(future)
+
+    # Merge historical + forecast
+    plot_df = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
+    plot_df = plot_df.merge(hist, on='ds', how='left', suffixes=('', '_hist'))
+    plot_df['ds'] = plot_df['ds'].dt.strftime('%Y-%m-%d')
+    plot_df['category'] = category
+    plot_df = plot_df.astype(object).where(plot_df.notna(), None)
+    return model_to_json(m), plot_df.to_dict('records')
+
+
+def _category_prefix(category):
+    # Hashed so any category name makes a safe, collision-free file prefix
+    return 'category-' + hashlib.sha256(str(category).encode()).hexdigest()[:16]
+
+
+def _cache_path(category, key):
+    return os.path.join(CACHE_DIR, f'{_category_prefix(category)}-{key}.json')
+
+
+def _write_cache(category, key, model_json, records):
+    path = _cache_path(category, key)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'category': category, 'model': model_json, 'forecast': records}, f)
+    os.replace(path + '.tmp', path)
+    # Only the latest history of a category is ever looked up again
+    for stale in glob.glob(os.path.join(CACHE_DIR, f'{_category_prefix(category)}-*.json')):
+        if stale != path:
+            os.remove(stale)
+
+
+def _save_csv(category, records):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    filename = f"{OUTPUT_DIR}/{category}_forecast.csv"
+    pd.DataFrame(records).to_csv(filename, index=False)
+    print(f"Saved forecast for {category} → {filename}")
+
+
+def forecast_categories(histories, max_workers=None):
+    """Fit one Prophet model per category in parallel.
+
+    histories maps category -> DataFrame(ds, y). Categories whose history
+    hashes to an existing cache entry are returned without refitting.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    results = {}
+    pending = {}
+    for category, hist in histories.items():
+        if hist.empty:
+            print(f"No data for category: {category}, skipping.")
+            continue
+        key = series_key(hist)
+        if os.path.exists(_cache_path(category, key)):
+            with open(_cache_path(category, key)) as f:
+                results[category] = json.load(f)['forecast']
+            print(f"Forecast for {category} unchanged, using cached model")
+        else:
+            pending[category] = (key, hist)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                category: pool.submit(_fit_category, category, hist)
+                for category, (key, hist) in pending.items()
+            }
+            for category, future in futures.items():
+                model_json, records = future.result()
+                _write_cache(category, pending[category][0], model_json, records)
+                _save_csv(category, records)
+                results[category] = records
+
+    return [results[category] for category in histories if category in results]
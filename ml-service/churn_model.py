@@ -1,19 +1,36 @@
 
 import os
+import argparse
 import pandas as pd
-import numpy as np
 from datetime import datetime
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import accuracy_score, roc_auc_score
-import joblib
+from model_registry import register_model, load_model
+from compact_forest import CompactForest, LEAF_DTYPES
+from feature_store import load_features, add_recency_features
+from stages import StageTracker
+from training import (FEATURES, label_churn, fit_preprocessing,
+                      fit_forest, add_trees, balanced_class_weight, evaluate)
+
+parser = argparse.ArgumentParser(description='Train the churn RandomForest and register it')
+parser.add_argument('--n-jobs', type=int, default=-1, help='cores used to build trees (-1 = all)')
+parser.add_argument('--n-estimators', type=int, default=100)
+parser.add_argument('--warm-start', type=int, metavar='N', default=0,
+                    help='add N trees to the current registered model instead of training from scratch')
+parser.add_argument('--since', metavar='DATE',
+                    help='with --warm-start, only fit the new trees on customers active since DATE')
+parser.add_argument('--leaf-dtype', choices=LEAF_DTYPES, default='float64',
+                    help='precision of leaf probabilities in the serving artifact')
+parser.add_argument('--prune-depth', type=int, default=None, metavar='D',
+                    help='collapse subtrees below depth D in the serving artifact')
+args = parser.parse_args()
+stages = StageTracker()
 
 # --- 1. Ensure data directory exists ---
 os.makedirs('data', exist_ok=True)
 
-# --- 2. Load dataset ---
-df = pd.read_csv('data/dataset.csv')
+# --- 2. Load per-customer features ---
+stages.begin('load')
+df = load_features()
 
 # --- 3. Basic EDA ---
 print("Dataset shape:", df.shape)
@@ -21,66 +38,73 @@ print("Columns:", df.columns.tolist())
 print("Data types:\n", df.dtypes)
 print("Missing values:\n", df.isnull().sum())
 
-# --- 4. Handle dates ---
-df['signup_date'] = pd.to_datetime(df['signup_date'])
-df['last_purchase_date'] = pd.to_datetime(df['last_purchase_date'])
+# --- 4. Handle dates (already parsed by the feature store) ---
+stages.begin('features')
 current_date = datetime.now()
-df['days_since_last_purchase'] = (current_date - df['last_purchase_date']).dt.days
-df['days_since_signup'] = (current_date - df['signup_date']).dt.days
+df = add_recency_features(df, current_date)
 
 # --- 5. Feature engineering: Define churn ---
-# Churn = 1 if days_since_last_purchase > 90 or cancellations_count > 2 or subscription_status != 'active'
-df['churn'] = ((df['days_since_last_purchase'] > 90) |
-               (df['cancellations_count'] > 2) |
-               (df['subscription_status'] != 'active')).astype(int)
+df['churn'] = label_churn(df)
 print("Churn distribution:\n", df['churn'].value_counts())
-
-# --- 6. Select features ---
-features = ['age', 'gender', 'country', 'days_since_signup', 'days_since_last_purchase',
-            'cancellations_count', 'unit_price', 'quantity', 'purchase_frequency', 'category', 'Ratings']
-X = df[features].copy()
 y = df['churn']
 
-# --- 7. Preprocess categorical features ---
-categorical_cols = ['gender', 'country', 'category']
-label_encoders = {}
-for col in categorical_cols:
-    le = LabelEncoder()
-    X.loc[:, col] = le.fit_transform(X[col])
-    label_encoders[col] = le
-
-# Save all label encoders
-joblib.dump(label_encoders, 'label_encoders.pkl')
-
-# --- 8. Preprocess numeric features ---
-numeric_cols = ['age', 'days_since_signup', 'days_since_last_purchase', 
-                'cancellations_count', 'unit_price', 'quantity', 'purchase_frequency', 'Ratings']
-scaler = StandardScaler()
-X.loc[:, numeric_cols] = scaler.fit_transform(X[numeric_cols])
-
-# Save scaler
-joblib.dump(scaler, 'scaler.pkl')
-
-# --- 9. Train-test split ---
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# --- 10. Train model ---
-model = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced')
-model.fit(X_train, y_train)
-
-# Save model
-joblib.dump(model, 'churn_model.pkl')
+stages.begin('train')
+if args.warm_start:
+    # --- 6-8. Reuse the current model's fitted preprocessor ---
+    bundle = load_model(estimator=True)
+    model = bundle.model
+    preprocessor = bundle.preprocessor
+    X = bundle.prepare(df)
+
+    # --- 9. Only customers with new activity feed the added trees ---
+    recent = (df['last_purchase_date'] >= pd.Timestamp(args.since)).to_numpy() if args.since else slice(None)
+    X_train, X_test, y_train, y_test = train_test_split(X[recent], y[recent], test_size=0.2, random_state=42)
+
+    # --- 10. Grow the forest ---
+    model = add_trees(model, X_train, y_train, args.warm_start, n_jobs=args.n_jobs,
+                      class_weight=balanced_class_weight(y))
+else:
+    # --- 6-8. Train-test split ---
+    df_train, df_test, y_train, y_test = train_test_split(df, y, test_size=0.2, random_state=42)
+
+    # --- 9. Fit the preprocessor on the training rows only, then apply it everywhere ---
+    X_train, preprocessor = fit_preprocessing(df_train)
+    X_test = preprocessor.transform(df_test[FEATURES])
+    X = preprocessor.transform(df[FEATURES])
+
+    # --- 10. Train model ---
+    model = fit_forest(X_train, y_train, n_estimators=args.n_estimators, n_jobs=args.n_jobs)
 
 # --- 11. Evaluate model ---
-y_pred = model.predict(X_test)
-y_pred_proba = model.predict_proba(X_test)[:, 1]
-print("Accuracy:", accuracy_score(y_test, y_pred))
-print("ROC-AUC:", roc_auc_score(y_test, y_pred_proba))
+stages.begin('evaluate')
+# Metrics are for the artifact that will be served, including any reduced
+# precision or pruning
+forest = CompactForest.from_estimator(model, leaf_dtype=args.leaf_dtype, max_depth=args.prune_depth)
+metrics = evaluate(forest, X_test, y_test)
+metrics['n_train'] = int(len(X_train))
+print("Accuracy:", metrics['accuracy'])
+print("ROC-AUC:", metrics.get('roc_auc'))
+if args.warm_start:
+    # The old trees may have trained on these test rows, so these numbers
+    # only describe the delta; the parent's held-out metrics stay the
+    # headline figures
+    metrics = {**bundle.metadata.get('metrics', {}), 'n_estimators': int(model.n_estimators),
+               'parent_version': bundle.version, 'delta_metrics': metrics}
+    print(f"(delta metrics; keeping the held-out metrics of version {bundle.version})")
+
+# Register model, preprocessor and feature schema as a new version
+version = register_model(model, preprocessor, FEATURES, metrics, forest=forest)
+print(f"Registered model version {version}")
 
 # --- 12. Predict churn probabilities for all customers ---
-df['churn_probability'] = (model.predict_proba(X)[:, 1] * 100).round(2)  # as percentage
+stages.begin('serialize')
+# Scored with the registered serving artifact, so the published
+# probabilities match what the backend returns
+df['churn_probability'] = (forest.predict_proba(X)[:, 1] * 100).round(2)  # as percentage
 
 # --- 13. Save predictions ---
 df[['customer_id', 'churn_probability']].to_csv('data/churn_probabilities.csv', index=False)
 
-print("Model trained and saved. Predictions saved to data/churn_probabilities.csv")
+print("Model trained and registered. Predictions saved to data/churn_probabilities.csv")
+
+stages.summary()
@@ -0,0 +1,39 @@
+import os
+
+# Arrow IPC files, one per dashboard section: data/arrow/<dataset>/<section>.arrow
+ARROW_DIR = 'data/arrow'
+
+
+def section_path(dataset, section, base_dir=ARROW_DIR):
+    return os.path.join(base_dir, dataset, f'{section}.arrow')
+
+
+def write_section(dataset, section, df, base_dir=ARROW_DIR):
+    # pyarrow is imported here so scripts that skip the export don't pay for it
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    path = section_path(dataset, section, base_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Uncompressed so readers can memory-map the columns without decoding;
+    # written to a temp file and renamed so readers never see a partial file
+    feather.write_feather(table, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def write_sections(dataset, sections, base_dir=ARROW_DIR):
+    for section, df in sections.items():
+        path = write_section(dataset, section, df, base_dir)
+        print(f"Saved {dataset}.{section} ({len(df)} rows) → {path}")
+
+
+def read_section(dataset, section, base_dir=ARROW_DIR):
+    """A previously exported section as a DataFrame, or None if there isn't one."""
+    import pyarrow.feather as feather
+
+    path = section_path(dataset, section, base_dir)
+    if not os.path.exists(path):
+        return None
+    return feather.read_table(path).to_pandas()
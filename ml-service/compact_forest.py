@@ -0,0 +1,139 @@
+import numpy as np
+
+LEAF_DTYPES = ['float64', 'float32', 'float16']
+
+# Rows scored per traversal; bounds the (rows x trees) index matrix
+CHUNK_ROWS = 8192
+
+
+def _node_depths(left, right):
+    depth = np.zeros(len(left), dtype=np.int32)
+    frontier = np.array([0])
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[children >= 0]
+        level += 1
+    return depth
+
+
+class CompactForest:
+    """A fitted RandomForestClassifier flattened into a few numpy arrays.
+
+    Every tree's nodes live in one set of arrays, with leaves pointing at
+    themselves so all trees can be walked together for a fixed number of
+    steps. Nothing here is a Python object per node, so a joblib artifact
+    loaded with mmap_mode='r' keeps the arrays in the shared page cache
+    instead of each worker's private heap, and scoring needs only numpy.
+
+    Thresholds are stored as float32 rounded down, which gives the same
+    splits as scikit-learn for its float32 inputs. leaf_dtype float32/float16
+    and max_depth (collapse deeper subtrees into their root's class
+    distribution) trade accuracy for size.
+    """
+
+    def __init__(self, feature, threshold, left, right, proba, roots, depth, missing_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.proba = proba
+        self.roots = roots
+        self.depth = depth
+        self.missing_left = missing_left
+
+    @classmethod
+    def from_estimator(cls, model, leaf_dtype='float64', max_depth=None):
+        if leaf_dtype not in LEAF_DTYPES:
+            raise ValueError(f"leaf_dtype must be one of {', '.join(LEAF_DTYPES)}")
+        positive = list(model.classes_).index(1)
+        parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'proba', 'missing_left')}
+        roots, offset, forest_depth = [], 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left
+            right = tree.children_right
+            depth = _node_depths(left, right)
+            # Pruning drops everything below max_depth and renumbers the
+            # remaining nodes (still in depth-first order) so the arrays shrink
+            leaf = left < 0
+            keep = np.ones(tree.node_count, dtype=bool)
+            if max_depth is not None:
+                leaf = leaf | (depth >= max_depth)
+                keep = depth <= max_depth
+            leaf = leaf[keep]
+            new_id = np.cumsum(keep) - 1
+            n_nodes = int(keep.sum())
+            tree_depth = int(depth[keep].max())
+            forest_depth = max(forest_depth, tree_depth)
+
+            own = np.arange(n_nodes)
+            value = tree.value[keep, 0, :]
+            threshold = tree.threshold[keep].astype(np.float32)
+            # Round down so float32 x <= t32 exactly when x <= t
+            threshold = np.where(threshold > tree.threshold[keep], np.nextafter(threshold, np.float32(-np.inf)), threshold)
+            parts['feature'].append(np.where(leaf, 0, tree.feature[keep]))
+            parts['threshold'].append(threshold)
+            parts['left'].append(np.where(leaf, own, new_id[left[keep]]) + offset)
+            parts['right'].append(np.where(leaf, own, new_id[right[keep]]) + offset)
+            parts['proba'].append(value[:, positive] / value.sum(axis=1))
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            parts['missing_left'].append(np.zeros(n_nodes, dtype=bool) if missing_left is None
+                                         else np.asarray(missing_left, dtype=bool)[keep] & ~leaf)
+            roots.append(offset)
+            offset += n_nodes
+
+        missing_left = np.concatenate(parts['missing_left'])
+        return cls(
+            feature=np.concatenate(parts['feature']).astype(np.int16),
+            threshold=np.concatenate(parts['threshold']).astype(np.float32),
+            left=np.concatenate(parts['left']).astype(np.int32),
+            right=np.concatenate(parts['right']).astype(np.int32),
+            proba=np.concatenate(parts['proba']).astype(leaf_dtype),
+            roots=np.array(roots, dtype=np.int32),
+            depth=forest_depth,
+            missing_left=missing_left if missing_left.any() else None,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.right, self.proba, self.roots]
+        if self.missing_left is not None:
+            arrays.append(self.missing_left)
+        return sum(a.nbytes for a in arrays)
+
+    def _positive_proba(self, X):
+        n_rows, n_trees = len(X), len(self.roots)
+        # One flat slot per (row, tree); slots drop out once they reach a leaf
+        node = np.tile(self.roots, n_rows)
+        x_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * X.shape[1], n_trees)
+        X = X.ravel()
+        active = np.arange(node.size)
+        for _ in range(self.depth):
+            current = node[active]
+            left = self.left.take(current)
+            inner = left != current
+            active, current, left = active[inner], current[inner], left[inner]
+            if not active.size:
+                break
+            x = X.take(x_offset[active] + self.feature.take(current))
+            go_left = x <= self.threshold.take(current)
+            if self.missing_left is not None:
+                go_left |= np.isnan(x) & self.missing_left.take(current)
+            node[active] = np.where(go_left, left, self.right.take(current))
+        return self.proba.take(node).astype(np.float64).reshape(n_rows, n_trees).mean(axis=1)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        p = np.concatenate([self._positive_proba(X[i:i + CHUNK_ROWS])
+                            for i in range(0, len(X), CHUNK_ROWS)]) if len(X) else np.empty(0)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        # Ties go to class 0, as with argmax in scikit-learn
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
@@ -0,0 +1,313 @@
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import read_orders_csv
+
+# Raw order history is kept as append-only Parquet parts with typed date
+# columns; the per-customer feature table is a single Parquet file keyed by
+# customer_id. Scripts read these instead of re-parsing the CSV.
+DATASET_CSV = 'data/dataset.csv'
+ORDERS_DIR = 'data/orders'
+FEATURES_PATH = 'data/customer_features.parquet'
+# Orders per CSV chunk (and per Parquet part) when building the store
+BUILD_CHUNKSIZE = 100_000
+# Rows per Parquet row group; --approx aggregates each row group in its own
+# process, so this bounds the rows any one of them reads
+ROW_GROUP_SIZE = 100_000
+
+# Rollups behind churnTrends and revenueTrends, kept in step with the store:
+# built with it, then updated only for the days/months appended orders touch.
+# Churn is kept per last-purchase day because whether a customer counts as
+# inactive depends on the reference date of each run.
+ROLLUP_DIR = 'data/rollups'
+CHURN_ROLLUP_PATH = os.path.join(ROLLUP_DIR, 'churn_daily.parquet')
+REVENUE_ROLLUP_PATH = os.path.join(ROLLUP_DIR, 'revenue_monthly.parquet')
+
+# Churn rule of generate_churn_data.py: inactive this long, or a lapsed subscription
+INACTIVE_DAYS = 180
+LAPSED_STATUSES = ['cancelled', 'paused']
+
+# Attributes taken from each customer's most recent order
+LATEST_COLS = ['age', 'gender', 'country', 'subscription_status', 'cancellations_count',
+               'purchase_frequency', 'unit_price', 'quantity', 'product_id', 'product_name',
+               'category', 'Ratings']
+
+
+def _key(col):
+    return f'{col}__key'
+
+
+def partial_features(orders):
+    """Per-customer aggregates of a batch of orders, indexed by customer_id.
+
+    Batches combine with merge_features in file order, so the CSV can be
+    ingested chunk by chunk; finish_features turns the result into the
+    feature table.
+    """
+    orders = orders.sort_values('last_purchase_date', kind='stable')
+    customer = orders['customer_id']
+    grouped = orders.groupby(customer, sort=False)
+    partial = grouped[LATEST_COLS].last()
+    # Sort position (last purchase, undated orders last) of the order each
+    # latest value came from; a later batch wins ties, as a later row would
+    order_key = orders['last_purchase_date'].fillna(pd.Timestamp.max)
+    keys = pd.DataFrame({_key(col): order_key.where(orders[col].notna()) for col in LATEST_COLS})
+    partial = partial.join(keys.groupby(customer, sort=False).max())
+    partial['signup_date'] = grouped['signup_date'].min()
+    partial['last_purchase_date'] = grouped['last_purchase_date'].max()
+    partial['revenue'] = (orders['unit_price'] * orders['quantity']).groupby(customer, sort=False).sum()
+    partial['n_orders'] = grouped['order_id'].count()
+    return partial
+
+
+def merge_features(current, partial):
+    """Combine the aggregates of earlier orders with a later batch's."""
+    if current is None:
+        return partial
+    cur, new = current.align(partial, join='outer')
+    merged = pd.DataFrame(index=cur.index)
+    for col in LATEST_COLS:
+        take = new[_key(col)].notna() & ~(new[_key(col)] < cur[_key(col)])
+        merged[col] = new[col].where(take, cur[col])
+        # Integer columns turn float wherever the outer join left gaps
+        dtype = np.result_type(current[col].dtype, partial[col].dtype)
+        if merged[col].dtype != dtype and merged[col].notna().all():
+            merged[col] = merged[col].astype(dtype)
+        merged[_key(col)] = new[_key(col)].where(take, cur[_key(col)])
+    merged['signup_date'] = np.fmin(cur['signup_date'].to_numpy(), new['signup_date'].to_numpy())
+    merged['last_purchase_date'] = np.fmax(cur['last_purchase_date'].to_numpy(),
+                                           new['last_purchase_date'].to_numpy())
+    merged['revenue'] = cur['revenue'].fillna(0) + new['revenue'].fillna(0)
+    merged['n_orders'] = (cur['n_orders'].fillna(0) + new['n_orders'].fillna(0)).astype('int64')
+    return merged
+
+
+def finish_features(partial):
+    features = partial.drop(columns=[_key(col) for col in LATEST_COLS])
+    # Same definition generate_churn_data.py has always used
+    features['amount'] = features['unit_price'] * features['quantity'] * features['purchase_frequency']
+    return features.reset_index()
+
+
+def compute_customer_features(orders):
+    return finish_features(partial_features(orders))
+
+
+def add_recency_features(features, reference_date):
+    # Day deltas depend on the reference date, so they are derived at read
+    # time rather than stored; this is a cheap vectorized subtraction.
+    features = features.copy()
+    features['days_since_last_purchase'] = (reference_date - features['last_purchase_date']).dt.days
+    features['days_since_signup'] = (reference_date - features['signup_date']).dt.days
+    return features
+
+
+def churn_counts(features):
+    """Customers and lapsed subscriptions per last-purchase day."""
+    day = features['last_purchase_date'].dt.normalize().rename('day')
+    counts = pd.DataFrame({
+        'customers': 1,
+        'lapsed': features['subscription_status'].isin(LAPSED_STATUSES).astype('int64'),
+    }, index=features.index)
+    return counts.groupby(day).sum()
+
+
+def revenue_by_month(orders):
+    month = orders['last_purchase_date'].dt.to_period('M').rename('month')
+    return (orders['unit_price'] * orders['quantity']).rename('revenue').groupby(month).sum()
+
+
+def _write_parquet(df, path):
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+
+def _order_parts():
+    return sorted(glob.glob(os.path.join(ORDERS_DIR, '*.parquet')))
+
+
+def order_parts():
+    """Parquet files of the order history, building the store if needed."""
+    if not _order_parts():
+        build()
+    return _order_parts()
+
+
+def load_orders(customer_ids=None, columns=None):
+    if not _order_parts():
+        build()
+    filters = [('customer_id', 'in', list(customer_ids))] if customer_ids is not None else None
+    return pd.read_parquet(ORDERS_DIR, columns=columns, filters=filters)
+
+
+def load_features():
+    if not os.path.exists(FEATURES_PATH):
+        build()
+    return pd.read_parquet(FEATURES_PATH)
+
+
+def _write_rollups(churn, revenue):
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    churn = churn[churn['customers'] > 0].sort_index()
+    _write_parquet(churn.reset_index(), CHURN_ROLLUP_PATH)
+    revenue = revenue.sort_index()
+    _write_parquet(pd.DataFrame({'month': revenue.index.astype(str), 'revenue': revenue.to_numpy()}),
+                   REVENUE_ROLLUP_PATH)
+
+
+def _read_rollups():
+    churn = pd.read_parquet(CHURN_ROLLUP_PATH).set_index('day')
+    revenue = pd.read_parquet(REVENUE_ROLLUP_PATH)
+    revenue = pd.Series(revenue['revenue'].to_numpy(), name='revenue',
+                        index=pd.PeriodIndex(revenue['month'], freq='M', name='month'))
+    return churn, revenue
+
+
+def _rollups_exist():
+    return os.path.exists(CHURN_ROLLUP_PATH) and os.path.exists(REVENUE_ROLLUP_PATH)
+
+
+def rebuild_rollups():
+    # For stores built before the rollups existed; a full pass over the store
+    _write_rollups(churn_counts(load_features()),
+                   revenue_by_month(load_orders(columns=['last_purchase_date', 'unit_price', 'quantity'])))
+
+
+def load_churn_rollup():
+    if not _rollups_exist():
+        rebuild_rollups()
+    return pd.read_parquet(CHURN_ROLLUP_PATH)
+
+
+def load_revenue_rollup():
+    """Monthly revenue as DataFrame(month 'YYYY-MM', revenue), oldest first."""
+    if not _rollups_exist():
+        rebuild_rollups()
+    return pd.read_parquet(REVENUE_ROLLUP_PATH)
+
+
+def churn_trend_history(reference_date):
+    """Monthly churn rate from the daily rollup as DataFrame(ds, y).
+
+    Same values as grouping the labelled feature table with
+    pd.Grouper(freq='M'), without touching the table: a day's customers are
+    all churned once it is INACTIVE_DAYS before reference_date, otherwise
+    only the lapsed ones are.
+    """
+    counts = load_churn_rollup()
+    inactive = (reference_date.normalize() - counts['day']).dt.days > INACTIVE_DAYS
+    churned = counts['customers'].where(inactive, counts['lapsed'])
+    month_end = counts['day'].dt.to_period('M').dt.to_timestamp(how='end').dt.normalize().rename('ds')
+    monthly = pd.DataFrame({'churned': churned, 'customers': counts['customers']}).groupby(month_end).sum()
+    return pd.DataFrame({'ds': monthly.index, 'y': (monthly['churned'] / monthly['customers']).to_numpy()})
+
+
+def _append_part(orders):
+    os.makedirs(ORDERS_DIR, exist_ok=True)
+    part_path = os.path.join(ORDERS_DIR, f'part-{time.time_ns()}.parquet')
+    _write_parquet(orders, part_path)
+    return part_path
+
+
+def _widen_dtypes(orders, dtypes):
+    """Cast a chunk to the dtypes of earlier chunks, widening those if needed.
+
+    Returns whether an earlier chunk's dtype changed, e.g. a column that was
+    all integers until this chunk brought a missing value.
+    """
+    widened = False
+    for col, dtype in orders.dtypes.items():
+        common = dtype if col not in dtypes else np.result_type(dtypes[col], dtype)
+        if common != dtype:
+            orders[col] = orders[col].astype(common)
+        widened |= col in dtypes and common != dtypes[col]
+        dtypes[col] = common
+    return widened
+
+
+def build(csv_path=DATASET_CSV, chunksize=BUILD_CHUNKSIZE):
+    """Rebuild the store from a CSV export, chunksize orders at a time.
+
+    Each chunk becomes one order part and is folded into the running
+    per-customer aggregates and monthly revenue, so memory follows the
+    number of customers rather than the number of orders.
+    """
+    old_parts = _order_parts()
+    parts, dtypes, widened = [], {}, False
+    partial, revenue, n_orders = None, None, 0
+    for orders in read_orders_csv(csv_path, chunksize=chunksize):
+        widened |= _widen_dtypes(orders, dtypes)
+        parts.append(_append_part(orders))
+        partial = merge_features(partial, partial_features(orders))
+        chunk_revenue = revenue_by_month(orders)
+        revenue = chunk_revenue if revenue is None else revenue.add(chunk_revenue, fill_value=0)
+        n_orders += len(orders)
+    if widened:
+        # Rewrite parts written before a dtype widened so they share one schema
+        for part in parts:
+            orders = pd.read_parquet(part)
+            if (orders.dtypes != pd.Series(dtypes)[orders.columns]).any():
+                _write_parquet(orders.astype(dtypes), part)
+    for part in old_parts:
+        os.remove(part)
+    features = finish_features(partial)
+    _write_parquet(features, FEATURES_PATH)
+    _write_rollups(churn_counts(features), revenue)
+    print(f"Feature store built: {n_orders} orders in {len(parts)} parts, {len(features)} customers")
+    return features
+
+
+def append_orders(new_orders):
+    if not os.path.exists(FEATURES_PATH):
+        build()
+
+    # Drop orders that are already in the store
+    known = load_orders(columns=['order_id'])['order_id']
+    new_orders = new_orders[~new_orders['order_id'].isin(known)]
+    if new_orders.empty:
+        print("No new orders to append")
+        return load_features()
+    _append_part(new_orders)
+
+    # Recompute features only for customers touched by the delta
+    affected = new_orders['customer_id'].unique()
+    history = load_orders(customer_ids=affected)
+    updated = compute_customer_features(history)
+
+    features = pd.read_parquet(FEATURES_PATH)
+    replaced = features['customer_id'].isin(affected)
+    previous = features[replaced]
+    features = pd.concat([features[~replaced], updated], ignore_index=True)
+    _write_parquet(features, FEATURES_PATH)
+
+    # Move the affected customers from their old last-purchase day to the
+    # new one and add the new orders' revenue to their months
+    if _rollups_exist():
+        churn, revenue = _read_rollups()
+        churn = churn.sub(churn_counts(previous), fill_value=0).add(churn_counts(updated), fill_value=0)
+        revenue = revenue.add(revenue_by_month(new_orders), fill_value=0)
+        _write_rollups(churn.astype('int64'), revenue)
+    else:
+        rebuild_rollups()
+    print(f"Appended {len(new_orders)} orders, recomputed {len(affected)} customers")
+    return features
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the per-customer feature store from '
+                                                 'data/dataset.csv, or append new orders to it')
+    parser.add_argument('--append', metavar='CSV', help='append new orders from a CSV export')
+    parser.add_argument('--chunksize', type=int, default=BUILD_CHUNKSIZE,
+                        help='orders read from the CSV (and written per Parquet part) at a time when rebuilding')
+    args = parser.parse_args()
+
+    if args.append:
+        append_orders(read_orders_csv(args.append))
+    else:
+        build(chunksize=args.chunksize)
@@ -3,158 +3,246 @@ import numpy as np
 import json
 import os
 from datetime import datetime
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from prophet import Prophet
 import warnings
+import argparse
+from feature_store import load_features, add_recency_features, churn_trend_history, INACTIVE_DAYS, LAPSED_STATUSES
+from columnar_export import write_sections, read_section
+from stages import StageTracker, measure
 warnings.filterwarnings('ignore')
 
-# ---------- Utility: Robust datetime ----------
-def robust_to_datetime(series):
-    s = pd.to_datetime(series, errors='coerce', infer_datetime_format=True)
-    if s.isna().sum() > 0:
-        s2 = pd.to_datetime(series, errors='coerce', dayfirst=True, infer_datetime_format=True)
-        if s2.isna().sum() < s.isna().sum():
-            s = s2
-    return s
-
-# ---------- Load data ----------
-df = pd.read_csv("data/dataset.csv")
-df['signup_date'] = robust_to_datetime(df.get('signup_date', pd.Series()))
-df['last_purchase_date'] = robust_to_datetime(df.get('last_purchase_date', pd.Series()))
-current_date = df['last_purchase_date'].max()
-df['inactive_days'] = (current_date - df['last_purchase_date']).dt.days
-df['tenure_days'] = (current_date - df['signup_date']).dt.days
-df['recency_days'] = df['inactive_days']
+# Heavy libraries (prophet, sklearn, the model registry) are imported inside
+# the stage that needs them, so skipped stages cost nothing at startup.
+# load/features/serialize always run; these can be selected:
+STAGES = ['score', 'forecast', 'segmentation']
+OUTPUT_PATH = 'data/churn_predictions.json'
+
+SEGMENT_COLORS = {
+    'High-Value Frequent Buyers':'#FF6B6B',
+    'High-Value Occasional Buyers':'#FFD93D',
+    'Frequent Low-Value Buyers':'#6BCF7F',
+    'At-Risk Customers':'#FFA500',
+    'Regular Customers':'#6BCF7F'
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate data/churn_predictions.json')
+    parser.add_argument('--only', nargs='+', choices=STAGES, metavar='STAGE',
+                        help=f'run just these stages ({", ".join(STAGES)}); other sections are kept from the previous output')
+    parser.add_argument('--skip', nargs='+', choices=STAGES, default=[], metavar='STAGE',
+                        help='stages to leave out; their sections are kept from the previous output')
+    parser.add_argument('--seg-sample-size', type=int, default=20000,
+                        help='customers sampled (stratified by country) to score candidate k')
+    parser.add_argument('--seg-minibatch', action='store_true',
+                        help='use MiniBatchKMeans for the k search and the final full-data fit')
+    parser.add_argument('--seg-time-budget', type=float, default=None,
+                        help='seconds allowed for the k search before keeping the best k so far')
+    args = parser.parse_args(argv)
+    selected = args.only or STAGES
+    args.stages = [stage for stage in STAGES if stage in selected and stage not in args.skip]
+    return args
+
+
+# ---------- Load features ----------
+def load():
+    df = load_features()
+    current_date = df['last_purchase_date'].max()
+    df = add_recency_features(df, current_date)
+    df['inactive_days'] = df['days_since_last_purchase']
+    df['tenure_days'] = df['days_since_signup']
+    df['recency_days'] = df['inactive_days']
+    return df
+
 
 # ---------- Create churn_label if missing ----------
-if 'churn_label' not in df.columns:
-    df['churn_label'] = ((df['inactive_days']>180) | df['subscription_status'].isin(['cancelled','paused'])).astype(int)
-else:
-    if df['churn_label'].dtype != np.integer:
+def add_churn_label(df):
+    if 'churn_label' not in df.columns:
+        df['churn_label'] = ((df['inactive_days']>INACTIVE_DAYS) | df['subscription_status'].isin(LAPSED_STATUSES)).astype(int)
+    elif df['churn_label'].dtype != np.integer:
+        from sklearn.preprocessing import LabelEncoder
         le = LabelEncoder()
         df['churn_label'] = le.fit_transform(df['churn_label'].astype(str))
+    return df
+
+
+# ---------- Churn probabilities from the registered model ----------
+def score(df):
+    from model_registry import load_model
+
+    # The model is trained by churn_model.py; its features are relative to today.
+    # The full scikit-learn forest scores one large batch faster than the
+    # compact serving artifact
+    bundle = load_model(estimator=True)
+    print(f"Scoring with model version {bundle.version}")
+    df['churn_probability'] = bundle.score(add_recency_features(df, datetime.now())) * 100
+
+    # ---------- Top 10 Customers ----------
+    top_customers = df.nlargest(10,'churn_probability')[['customer_id','churn_probability']]
+    top_customers['name'] = top_customers['customer_id'].astype(str)
+    top_customers = top_customers[['customer_id','name','churn_probability']].rename(columns={'customer_id':'id'})
+    top_customers['churn_probability'] = top_customers['churn_probability'].round(0).astype(int)
+
+    # ---------- Country- and category-level churn ----------
+    # One grouped pass over (category, country); per-country rates are rolled up
+    # from the same partial sums instead of filtering df once per category
+    grouped = df.groupby(['category','country'], sort=False, dropna=False)['churn_probability'].agg(['sum','count'])
+
+    by_country = grouped.groupby(level='country').sum()
+    countries = (by_country['sum'] / by_country['count']).rename('churn_probability').reset_index()
+    countries['churnRate'] = countries['churn_probability'].round(0).astype(int)
+    countries = countries[['country','churnRate']]
+
+    country_data = (grouped['sum'] / grouped['count']).rename('churn_probability').reset_index()
+    country_data = country_data.dropna(subset=['category','country'])
+    country_data['churnRate'] = country_data['churn_probability'].round(0).astype(int)
+    categories = [
+        {
+            'name': cat,
+            'countryData': cat_df.sort_values('country')[['country','churnRate']].to_dict('records')
+        }
+        for cat, cat_df in country_data.groupby('category', sort=False)
+    ]
+    return top_customers, countries, categories
 
-# ---------- Churn RF Model ----------
-churn_features = ['age','tenure_days','recency_days','purchase_frequency','amount','cancellations_count','Ratings']
-existing_features = [f for f in churn_features if f in df.columns]
-X = df[existing_features].fillna(df[existing_features].median())
-y = df['churn_label'].astype(int)
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-rf_model.fit(X_train_scaled, y_train)
-X_all_scaled = scaler.transform(X.fillna(X.median()))
-df['churn_probability'] = rf_model.predict_proba(X_all_scaled)[:,1]*100
-
-# ---------- Top 10 Customers ----------
-top_customers = df.nlargest(10,'churn_probability')[['customer_id','churn_probability']]
-top_customers['name'] = top_customers['customer_id'].astype(str)
-top_customers = top_customers[['customer_id','name','churn_probability']].rename(columns={'customer_id':'id'})
-top_customers['churn_probability'] = top_customers['churn_probability'].round(0).astype(int)
 
 # ---------- Prophet churn trend ----------
-churn_trend = df.groupby(pd.Grouper(key="last_purchase_date", freq="M"))['churn_label'].mean().reset_index()
-churn_trend.rename(columns={'last_purchase_date':'ds','churn_label':'y'}, inplace=True)
-model = Prophet()
-model.fit(churn_trend)
-future = model.make_future_dataframe(periods=6, freq="M")
-forecast = model.predict(future)
-churn_forecast = forecast[['ds','yhat']].copy()
-churn_forecast['churnRate'] = (churn_forecast['yhat']*100).round(0).astype(int)
-churn_forecast['month'] = churn_forecast['ds'].dt.strftime('%b')
-month_order = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-churn_forecast['month'] = pd.Categorical(churn_forecast['month'], categories=month_order, ordered=True)
-churn_trends = churn_forecast.sort_values('month')[['month','churnRate']]
-
-# Ensure 'amount' column exists
-if 'amount' not in df.columns:
-    if 'unit_price' in df.columns and 'quantity' in df.columns:
-        freq = df['purchase_frequency'] if 'purchase_frequency' in df.columns else 1
-        df['amount'] = (
-            pd.to_numeric(df['unit_price'], errors='coerce') *
-            pd.to_numeric(df['quantity'], errors='coerce') *
-            pd.to_numeric(freq, errors='coerce')
-        )
-    else:
-        df['amount'] = 0
+def forecast_trend(df):
+    from trend_forecasts import forecast_trend as cached_forecast
+
+    # Monthly churn rates come from the feature store's daily rollup, which
+    # appends keep up to date, so the feature table isn't regrouped here;
+    # the fit is skipped when the rates haven't changed since the last run
+    churn_trend = churn_trend_history(df['last_purchase_date'].max())
+    forecast = cached_forecast('churn', churn_trend, periods=6, freq="M")
+    churn_forecast = forecast[['ds','yhat']].copy()
+    churn_forecast['churnRate'] = (churn_forecast['yhat']*100).round(0).astype(int)
+    churn_forecast['month'] = churn_forecast['ds'].dt.strftime('%b')
+    month_order = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+    churn_forecast['month'] = pd.Categorical(churn_forecast['month'], categories=month_order, ordered=True)
+    return churn_forecast.sort_values('month')[['month','churnRate']]
+
 
 # ---------- K-Means Customer Segmentation ----------
-numeric_features = ['age','tenure_days','recency_days','purchase_frequency','amount']
-numeric_features = [f for f in numeric_features if f in df.columns]
-X_seg = StandardScaler().fit_transform(df[numeric_features].fillna(df[numeric_features].median()))
-best_score, best_k = -1, 3
-for k in [2,3,4,5]:
-    if k >= len(X_seg): continue
-    labels = KMeans(n_clusters=k, random_state=42,n_init=10).fit_predict(X_seg)
-    try: score = silhouette_score(X_seg, labels)
-    except: score=-1
-    if score>best_score: best_score=score; best_k=k
-km = KMeans(n_clusters=best_k, random_state=42,n_init=10)
-df['cluster'] = km.fit_predict(X_seg)
-
-# Assign segment names
-seg_stats = df.groupby('cluster')[numeric_features].mean()
-overall = seg_stats.mean()
-segment_names = {}
-for cluster in seg_stats.index:
-    stats = seg_stats.loc[cluster]
-    if stats['amount']>overall['amount'] and stats['purchase_frequency']>overall['purchase_frequency']:
-        segment_names[cluster] = "High-Value Frequent Buyers"
-    elif stats['amount']>overall['amount']:
-        segment_names[cluster] = "High-Value Occasional Buyers"
-    elif stats['purchase_frequency']>overall['purchase_frequency']:
-        segment_names[cluster] = "Frequent Low-Value Buyers"
-    elif stats['recency_days']>overall['recency_days']:
-        segment_names[cluster] = "At-Risk Customers"
-    else:
-        segment_names[cluster] = "Regular Customers"
-df['segment'] = df['cluster'].map(segment_names)
-
-# ---------- Segmentation summary ----------
-segmentation = df['segment'].value_counts().reset_index()
-segmentation.columns = ['name','value']
-segmentation['color'] = segmentation['name'].map({
-    'High-Value Frequent Buyers':'#FF6B6B',
-    'High-Value Occasional Buyers':'#FFD93D',
-    'Frequent Low-Value Buyers':'#6BCF7F',
-    'At-Risk Customers':'#FFA500',
-    'Regular Customers':'#6BCF7F'
-})
-
-# ---------- Country-level churn ----------
-countries = df.groupby('country')['churn_probability'].mean().reset_index()
-countries['churnRate'] = countries['churn_probability'].round(0).astype(int)
-countries = countries[['country','churnRate']]
-
-# ---------- Category-level churn ----------
-categories = []
-for cat in df['category'].dropna().unique():
-    cat_df = df[df['category']==cat]
-    country_data = cat_df.groupby('country')['churn_probability'].mean().reset_index()
-    country_data['churnRate'] = country_data['churn_probability'].round(0).astype(int)
-    categories.append({
-        'name': cat,
-        'countryData': country_data[['country','churnRate']].to_dict('records')
-    })
-
-# ---------- Build JSON ----------
-churn_data = {
-    'topCustomers': top_customers.to_dict('records'),
-    'churnTrends': churn_trends.to_dict('records'),
-    'segmentation': segmentation.to_dict('records'),
-    'countries': countries.to_dict('records'),
-    'categories': categories
-}
+def segment(df, args):
+    from preprocessing import numeric_pipeline
+    from segmentation import segment_customers
+
+    numeric_features = ['age','tenure_days','recency_days','purchase_frequency','amount']
+    numeric_features = [f for f in numeric_features if f in df.columns]
+    # Same coerce/impute/scale steps as the churn model's numeric columns
+    X_seg = numeric_pipeline().fit_transform(df[numeric_features])
+    labels, best_k, seg_timings = segment_customers(
+        X_seg, sample_size=args.seg_sample_size, strata=df['country'],
+        minibatch=args.seg_minibatch, time_budget=args.seg_time_budget)
+    df['cluster'] = labels
+    print(f"Segmentation: k={best_k}, " + ", ".join(f"{stage} {secs:.2f}s" for stage, secs in seg_timings.items()))
+
+    # Assign segment names
+    seg_stats = df.groupby('cluster')[numeric_features].mean()
+    overall = seg_stats.mean()
+    segment_names = {}
+    for cluster in seg_stats.index:
+        stats = seg_stats.loc[cluster]
+        if stats['amount']>overall['amount'] and stats['purchase_frequency']>overall['purchase_frequency']:
+            segment_names[cluster] = "High-Value Frequent Buyers"
+        elif stats['amount']>overall['amount']:
+            segment_names[cluster] = "High-Value Occasional Buyers"
+        elif stats['purchase_frequency']>overall['purchase_frequency']:
+            segment_names[cluster] = "Frequent Low-Value Buyers"
+        elif stats['recency_days']>overall['recency_days']:
+            segment_names[cluster] = "At-Risk Customers"
+        else:
+            segment_names[cluster] = "Regular Customers"
+    df['segment'] = df['cluster'].map(segment_names)
+
+    # ---------- Segmentation summary ----------
+    segmentation = df['segment'].value_counts().reset_index()
+    segmentation.columns = ['name','value']
+    segmentation['color'] = segmentation['name'].map(SEGMENT_COLORS)
+    return segmentation
+
+
+def load_previous_output():
+    if not os.path.exists(OUTPUT_PATH):
+        return {}
+    with open(OUTPUT_PATH) as f:
+        return json.load(f)
+
+
+def customer_scores(df, args):
+    """Per-customer scores for the Arrow export, or None if nothing changed.
+
+    A column whose stage was skipped is taken from the previous export.
+    """
+    if 'score' not in args.stages and 'segmentation' not in args.stages:
+        return None
+    columns = ['customer_id','country','category','segment','churn_probability']
+    missing = [c for c in ('segment','churn_probability') if c not in df.columns]
+    scores = df[[c for c in columns if c not in missing]].copy()
+    if missing:
+        previous = read_section('churn', 'customerScores')
+        if previous is None:
+            raise SystemExit("No previous customerScores export to reuse; run without --only/--skip first")
+        scores = scores.merge(previous[['customer_id', *missing]], on='customer_id', how='left')
+    scores['churn_probability'] = scores['churn_probability'].round(2)
+    return scores[columns]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = StageTracker()
+    print("Running stages: " + ", ".join(args.stages or ['none']))
+
+    stages.begin('load')
+    df = load()
+
+    stages.begin('features')
+    df = add_churn_label(df)
+
+    # Sections from stages that don't run are carried over unchanged
+    churn_data = load_previous_output() if len(args.stages) < len(STAGES) else {}
+    countries = None
+
+    if 'score' in args.stages:
+        stages.begin('score')
+        top_customers, countries, categories = score(df)
+        churn_data['topCustomers'] = top_customers.to_dict('records')
+        churn_data['countries'] = countries.to_dict('records')
+        churn_data['categories'] = categories
+
+    if 'forecast' in args.stages:
+        stages.begin('forecast')
+        churn_data['churnTrends'] = forecast_trend(df).to_dict('records')
+
+    if 'segmentation' in args.stages:
+        stages.begin('cluster')
+        churn_data['segmentation'] = segment(df, args).to_dict('records')
+
+    # ---------- Save JSON ----------
+    stages.begin('serialize')
+    order = ['topCustomers', 'churnTrends', 'segmentation', 'countries', 'categories']
+    churn_data = {key: churn_data[key] for key in order if key in churn_data}
+    os.makedirs('data', exist_ok=True)
+    # Written to a temp file and renamed so readers never see a half-written file
+    with measure('json_dump'), open(OUTPUT_PATH + '.tmp','w') as f:
+        json.dump(churn_data, f, indent=2)
+    os.replace(OUTPUT_PATH + '.tmp', OUTPUT_PATH)
+
+    print(f"Churn predictions JSON saved to {OUTPUT_PATH}")
+
+    # ---------- Columnar export (Arrow IPC) ----------
+    # Per-customer scores back /api/churn/customers and, with the other large
+    # sections, are served as Arrow to clients that ask for it
+    sections = {}
+    scores = customer_scores(df, args)
+    if scores is not None:
+        sections['customerScores'] = scores
+    if countries is not None:
+        sections['countries'] = countries
+    write_sections('churn', sections)
+
+    stages.summary()
 
-# ---------- Save JSON ----------
-os.makedirs('data', exist_ok=True)
-with open('data/churn_predictions.json','w') as f:
-    json.dump(churn_data, f, indent=2)
 
-print("Churn predictions JSON saved to data/churn_predictions.json")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
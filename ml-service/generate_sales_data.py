@@ -1,155 +1,161 @@
 import pandas as pd
 import json
 from datetime import datetime
-import numpy as np
-from prophet import Prophet
 import os
-import requests
-
-# Load the dataset
-df = pd.read_csv('data/dataset.csv')
-
-# Compute revenue
-df['revenue'] = df['unit_price'] * df['quantity']
-
-# salesByCategory: Top categories by total revenue
-sales_by_category = df.groupby('category')['revenue'].sum().sort_values(ascending=False).reset_index()
-sales_by_category['percentage'] = (sales_by_category['revenue'] / sales_by_category['revenue'].sum() * 100).round(2)
-sales_by_category_json = sales_by_category.head(10).to_dict('records')  # Top 10
-
-# revenueTrends: Monthly revenue trends from last_purchase_date
-df['last_purchase_date'] = pd.to_datetime(df['last_purchase_date'])
-df['month'] = df['last_purchase_date'].dt.to_period('M')
-revenue_trends = df.groupby('month')['revenue'].sum().reset_index()
-revenue_trends['month'] = revenue_trends['month'].astype(str)
-
-# Forecast next 12 months using Prophet
-hist = revenue_trends.copy()
-hist['ds'] = pd.to_datetime(hist['month'])
-hist['y'] = hist['revenue']
-hist = hist[['ds', 'y']].sort_values('ds')
-
-m = Prophet(changepoint_prior_scale=0.01, weekly_seasonality=False, yearly_seasonality=True)
-m.fit(hist)
-
-future = m.make_future_dataframe(periods=13, freq='M')
-forecast = m.predict(future)
-
-# Add predicted months
-predicted = forecast[forecast['ds'] > pd.to_datetime('2025-12')][['ds', 'yhat']]
-predicted['month'] = predicted['ds'].dt.to_period('M').astype(str)
-predicted['revenue'] = predicted['yhat']
-predicted['isPredicted'] = False
-predicted = predicted[['month', 'revenue', 'isPredicted']]
-
-# Append to revenue_trends
-revenue_trends['isPredicted'] = False
-revenue_trends = pd.concat([revenue_trends, predicted], ignore_index=True)
-revenue_trends_json = revenue_trends.to_dict('records')
-
-# ageDistribution: Age groups distribution (bins: 18-25, 26-35, 36-45, 46-60, 60+)
-df['age_group'] = pd.cut(df['age'], bins=[0, 25, 35, 45, 60, 100], labels=['18-25', '26-35', '36-45', '46-60', '60+'])
-age_dist = df['age_group'].value_counts().sort_index().reset_index()
-age_dist.columns = ['age_group', 'count']
-age_dist['percentage'] = (age_dist['count'] / len(df) * 100).round(2)
-age_dist_json = age_dist.to_dict('records')
-
-# customerSegments: Simple RFM-like segments based on purchase_frequency and total revenue per customer
-customer_data = df.groupby('customer_id').agg({
-    'purchase_frequency': 'max',
-    'revenue': 'sum',
-    'last_purchase_date': 'max'
-}).reset_index()
-customer_data['recency'] = (datetime.now() - customer_data['last_purchase_date']).dt.days
-customer_data['segment'] = np.where(
-    (customer_data['purchase_frequency'] > df['purchase_frequency'].median()) & 
-    (customer_data['revenue'] > customer_data['revenue'].median()) & 
-    (customer_data['recency'] < customer_data['recency'].median()), 'High Value',
-    np.where(
-        (customer_data['revenue'] > customer_data['revenue'].median()), 'Medium Value',
-        'Low Value'
-    )
-)
-segments = customer_data['segment'].value_counts().reset_index()
-segments.columns = ['segment', 'count']
-segments['percentage'] = (segments['count'] / len(customer_data) * 100).round(2)
-segments_json = segments.to_dict('records')
-
-
-# Top 10 products by total revenue
-top_products = (
-    df.groupby(['product_id', 'product_name', 'country'])['revenue']
-    .sum()
-    .reset_index()
-    .sort_values('revenue', ascending=False)
-    .head(10)
-    .to_dict('records')
-)
-
-# Compile JSON
-sales_data = {
-    "salesByCategory": sales_by_category_json,
-    "revenueTrends": revenue_trends_json,
-    "ageDistribution": age_dist_json,
-    "customerSegments": segments_json,
-    "topProducts": top_products
-}
-
-# Forecast revenue per category using Prophet
-# os.makedirs("inventory_forecasts", exist_ok=True)
-
-# categories = df['category'].dropna().unique()
-
-# forecasts = []
-
-# for category in categories:
-#     # Aggregate monthly revenue
-#     hist = df[df['category']==category].groupby(
-#         pd.Grouper(key='last_purchase_date', freq='M')
-#     )['revenue'].sum().reset_index()
-    
-#     hist = hist.rename(columns={'last_purchase_date':'ds','revenue':'y'})
-#     hist = hist.sort_values('ds')
-
-#     if hist.empty:
-#         print(f"No data for category: {category}, skipping.")
-#         continue
-
-#     # Fit Prophet with smoother trend
-#     m = Prophet(changepoint_prior_scale=0.01, weekly_seasonality=False, yearly_seasonality=True)
-#     m.fit(hist)
-
-#     # Forecast next 12 months
-#     future = m.make_future_dataframe(periods=12, freq='M')
-#     forecast = m.predict(future)
-
-#     # Merge historical + forecast
-#     plot_df = forecast[['ds','yhat','yhat_lower','yhat_upper']].copy()
-#     plot_df = plot_df.merge(hist, on='ds', how='left', suffixes=('','_hist'))
-
-#     # Save as CSV per category
-#     filename = f"inventory_forecasts/{category}_forecast.csv"
-#     plot_df.to_csv(filename, index=False)
-#     print(f"Saved forecast for {category} → {filename}")
-
-#     # Add to forecasts list
-#     plot_df['category'] = category
-#     forecasts.append(plot_df.to_dict('records'))
-
-sales_data['forecasts'] = []
-
-# Post to backend
-try:
-    response = requests.post('http://localhost:5000/api/sales', json=sales_data)
-    if response.status_code == 200:
-        print("Sales data posted to backend successfully")
+import argparse
+from feature_store import FEATURES_PATH, load_orders, load_revenue_rollup, order_parts
+from sales_aggregates import (SalesAggregator, approximate_segments, customer_segments, parquet_partitions,
+                              sketch_orders, stream_orders)
+from category_forecasts import forecast_categories
+from trend_forecasts import forecast_trend
+from columnar_export import write_sections
+from stages import StageTracker, measure
+
+
+def post_sales_data(url, sales_data, retries=3, timeout=10):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=['POST'])
+    session.mount('http://', HTTPAdapter(max_retries=retry))
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+    try:
+        response = session.post(url, data=json.dumps(sales_data, default=str),
+                                headers={'Content-Type': 'application/json'}, timeout=timeout)
+        if response.status_code == 200:
+            print("Sales data posted to backend successfully")
+        else:
+            print(f"Failed to post sales data: {response.status_code}")
+    except Exception as e:
+        print(f"Error posting sales data: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate data/sales_data.json')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--stream', action='store_true',
+                      help="aggregate the feature store's orders in chunks instead of loading them into memory")
+    mode.add_argument('--approx', action='store_true',
+                      help='sketch the feature store per Parquet row group in parallel: approximate medians, '
+                           'top products and distinct customers in bounded memory')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='rows per chunk in --stream mode')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for per-category forecasts and --approx partitions (default: all cores)')
+    parser.add_argument('--post-url', default='http://localhost:5000/api/sales',
+                        help='backend endpoint to publish the result to')
+    parser.add_argument('--no-post', action='store_true',
+                        help="only write data/sales_data.json (the backend picks up file changes)")
+    args = parser.parse_args()
+    stages = StageTracker()
+
+    # Aggregate the order history; in streaming mode memory stays flat regardless of input size
+    stages.begin('load')
+    if args.stream:
+        agg = stream_orders(order_parts(), chunksize=args.chunksize)
+    elif args.approx:
+        agg = sketch_orders(parquet_partitions(order_parts()), max_workers=args.workers)
+        print(f"Approximate mode: ~{agg.n_customers()} distinct customers in {agg.n_rows} orders")
     else:
-        print(f"Failed to post sales data: {response.status_code}")
-except Exception as e:
-    print(f"Error posting sales data: {e}")
-
-# Also save to JSON as backup
-with open('data/sales_data.json', 'w') as f:
-    json.dump(sales_data, f, indent=2, default=str)
-
-print("Sales data generated and saved to data/sales_data.json")
+        agg = SalesAggregator().update(load_orders())
+
+    # salesByCategory: Top categories by total revenue
+    sales_by_category = agg.sales_by_category()
+    sales_by_category['percentage'] = (sales_by_category['revenue'] / sales_by_category['revenue'].sum() * 100).round(2)
+    sales_by_category_json = sales_by_category.head(10).to_dict('records')  # Top 10
+
+    # revenueTrends: Monthly revenue trends from last_purchase_date; the
+    # feature store keeps these as a rollup that appends update in place
+    revenue_trends = load_revenue_rollup()
+
+    # Forecast next 12 months using Prophet
+    stages.begin('forecast')
+    hist = revenue_trends.copy()
+    hist['ds'] = pd.to_datetime(hist['month'])
+    hist['y'] = hist['revenue']
+    hist = hist[['ds', 'y']].sort_values('ds')
+
+    # Skipped when the monthly revenue is unchanged, warm-started otherwise
+    forecast = forecast_trend('revenue', hist, periods=13, freq='M', prophet_params={
+        'changepoint_prior_scale': 0.01, 'weekly_seasonality': False, 'yearly_seasonality': True})
+
+    # Add predicted months
+    predicted = forecast[forecast['ds'] > pd.to_datetime('2025-12')][['ds', 'yhat']]
+    predicted['month'] = predicted['ds'].dt.to_period('M').astype(str)
+    predicted['revenue'] = predicted['yhat']
+    predicted['isPredicted'] = False
+    predicted = predicted[['month', 'revenue', 'isPredicted']]
+
+    # Append to revenue_trends
+    revenue_trends['isPredicted'] = False
+    revenue_trends = pd.concat([revenue_trends, predicted], ignore_index=True)
+    revenue_trends_json = revenue_trends.to_dict('records')
+
+    # Forecast revenue per category using Prophet, one process per category;
+    # categories whose monthly history is unchanged reuse the cached fit
+    category_forecasts = forecast_categories(agg.category_histories(), max_workers=args.workers)
+
+    # ageDistribution: Age groups distribution (bins: 18-25, 26-35, 36-45, 46-60, 60+)
+    stages.begin('aggregate')
+    age_dist = agg.age_distribution()
+    age_dist['percentage'] = (age_dist['count'] / agg.n_rows * 100).round(2)
+    age_dist_json = age_dist.to_dict('records')
+
+    # customerSegments: Simple RFM-like segments based on purchase_frequency and total revenue per customer
+    now = datetime.now()
+    if args.approx:
+        counts, n_customers = approximate_segments(parquet_partitions([FEATURES_PATH]), now,
+                                                   agg.purchase_frequency_median(), max_workers=args.workers)
+        segments = counts.sort_values(ascending=False).rename_axis('segment').rename('count').reset_index()
+    else:
+        customer_data = agg.customer_data()
+        customer_data['recency'] = (now - customer_data['last_purchase_date']).dt.days
+        customer_data['segment'] = customer_segments(customer_data, agg.purchase_frequency_median(),
+                                                     customer_data['revenue'].median(),
+                                                     customer_data['recency'].median())
+        segments = customer_data['segment'].value_counts().reset_index()
+        segments.columns = ['segment', 'count']
+        n_customers = len(customer_data)
+    segments['percentage'] = (segments['count'] / n_customers * 100).round(2)
+    segments_json = segments.to_dict('records')
+
+
+    # Top 10 products by total revenue
+    top_products = agg.top_products(10)
+
+    # Compile JSON
+    sales_data = {
+        "salesByCategory": sales_by_category_json,
+        "revenueTrends": revenue_trends_json,
+        "ageDistribution": age_dist_json,
+        "customerSegments": segments_json,
+        "topProducts": top_products,
+        "forecasts": category_forecasts,
+    }
+
+    # Save to JSON; written to a temp file and renamed so readers never see a half-written file
+    stages.begin('serialize')
+    with measure('json_dump'), open('data/sales_data.json.tmp', 'w') as f:
+        json.dump(sales_data, f, indent=2, default=str)
+    os.replace('data/sales_data.json.tmp', 'data/sales_data.json')
+
+    print("Sales data generated and saved to data/sales_data.json")
+
+    # Columnar copies of the larger sections for Arrow clients
+    write_sections('sales', {
+        'revenueTrends': revenue_trends,
+        'salesByCategory': sales_by_category,
+        'topProducts': pd.DataFrame(top_products),
+    })
+
+    # Post to backend
+    if not args.no_post:
+        stages.begin('publish')
+        post_sales_data(args.post_url, sales_data)
+
+    stages.summary()
+
+if __name__ == '__main__':
+    # Guard needed: the forecast process pool re-imports this module on spawn platforms
+    main()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from stages import measure
+
+DATE_COLS = ['signup_date', 'last_purchase_date']
+
+# Tried in order; ties go to the earlier format (month-first, like pandas)
+CANDIDATE_FORMATS = ['%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%m-%d-%Y',
+                     '%d.%m.%Y', '%Y-%m-%d %H:%M:%S']
+
+
+def detect_date_format(series, sample_size=1000):
+    """Best explicit format for a column of date strings, or None.
+
+    Only a sample of the distinct values is tried against each candidate.
+    """
+    values = pd.Series(series.dropna().unique())
+    if values.empty:
+        return None
+    sample = values.sample(min(sample_size, len(values)), random_state=0).astype(str)
+    best_fmt, best_parsed = None, 0
+    for fmt in CANDIDATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if parsed > best_parsed:
+            best_fmt, best_parsed = fmt, parsed
+        if parsed == len(sample):
+            break
+    return best_fmt
+
+
+def _to_datetime(values, fmt):
+    if fmt is None:
+        return pd.to_datetime(values, errors='coerce')
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    # Stragglers that don't match the detected format get pandas' inference
+    missing = parsed.isna() & pd.notna(values)
+    if missing.any():
+        parsed = parsed.where(~missing, pd.to_datetime(values.where(missing), errors='coerce'))
+    return parsed
+
+
+class DateParser:
+    """Parses date columns once per distinct string.
+
+    The format is detected on the first chunk of each column and reused, and
+    parsed values are cached across calls, so streaming many chunks only
+    parses dates that haven't been seen before.
+    """
+
+    def __init__(self):
+        self.formats = {}
+        self.cache = {}
+
+    def parse(self, series, column=None):
+        column = column or series.name
+        if column not in self.formats:
+            self.formats[column] = detect_date_format(series)
+        cache = self.cache.setdefault(column, {})
+
+        codes, uniques = pd.factorize(series)
+        new = [u for u in uniques if u not in cache]
+        if new:
+            parsed = _to_datetime(pd.Index(new, dtype=object), self.formats[column])
+            cache.update(zip(new, parsed.to_numpy()))
+        # Code -1 (missing) picks the trailing NaT
+        lookup = np.array([cache[u] for u in uniques] + [np.datetime64('NaT')], dtype='datetime64[ns]')
+        return pd.Series(lookup[codes], index=series.index, name=series.name)
+
+    def parse_frame(self, df, columns=DATE_COLS):
+        for col in columns:
+            if col in df.columns:
+                df[col] = self.parse(df[col], col)
+        return df
+
+
+def read_orders_csv(path, chunksize=None, parser=None):
+    """Read an order export with typed date columns.
+
+    With chunksize, yields typed chunks that share one DateParser.
+    """
+    parser = parser or DateParser()
+    dtype = {col: str for col in DATE_COLS}
+    if chunksize is None:
+        with measure('csv_load'):
+            df = pd.read_csv(path, dtype=dtype)
+        with measure('date_parse'):
+            return parser.parse_frame(df)
+    return (parser.parse_frame(chunk) for chunk in pd.read_csv(path, dtype=dtype, chunksize=chunksize))
@@ -0,0 +1,178 @@
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+
+import joblib
+
+from compact_forest import CompactForest
+
+# Versioned churn models: models/<version>/{model.joblib, estimator.joblib, metadata.json}
+# plus a CURRENT file naming the version that scoring should use.
+#
+# model.joblib is the serving artifact: the forest flattened into arrays
+# (compact_forest.py) plus the fitted preprocessor, stored uncompressed so it
+# can be memory-mapped and shared by every worker. estimator.joblib is the
+# compressed scikit-learn forest, only loaded to grow it or for bulk scoring.
+REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+CURRENT_FILE = 'CURRENT'
+ARTIFACT_FILE = 'model.joblib'
+ESTIMATOR_FILE = 'estimator.joblib'
+ARTIFACT_FORMAT = 2
+# Set MODEL_MMAP=0 to load the forest arrays into private memory instead
+MODEL_MMAP = os.getenv('MODEL_MMAP', '1') != '0'
+
+
+class ModelBundle:
+    def __init__(self, version, model, preprocessor, metadata, load_seconds=None):
+        self.version = version
+        # A CompactForest, or the scikit-learn forest when loaded with estimator=True
+        self.model = model
+        # The fitted preprocessing.build_preprocessor() the model was trained with
+        self.preprocessor = preprocessor
+        self.load_seconds = load_seconds
+        self.metadata = metadata
+        self.features = metadata['features']
+
+    def prepare(self, df):
+        # Imported here so the backend can import the registry without pandas
+        import pandas as pd
+
+        df = pd.DataFrame(df)
+        now = datetime.now()
+        if 'days_since_signup' not in df.columns and 'signup_date' in df.columns:
+            df['days_since_signup'] = (now - pd.to_datetime(df['signup_date'])).dt.days
+        if 'days_since_last_purchase' not in df.columns and 'last_purchase_date' in df.columns:
+            df['days_since_last_purchase'] = (now - pd.to_datetime(df['last_purchase_date'])).dt.days
+        missing = [f for f in self.features if f not in df.columns]
+        if missing:
+            raise ValueError(f"Missing features: {', '.join(missing)}")
+        return self.preprocessor.transform(df[self.features])
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)[:, 1]
+
+    def score(self, df):
+        return self.predict_proba(self.prepare(df))
+
+
+def _version_dir(version):
+    return os.path.join(REGISTRY_DIR, version)
+
+
+def list_versions():
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    return sorted(v for v in os.listdir(REGISTRY_DIR)
+                  if os.path.exists(os.path.join(_version_dir(v), 'metadata.json')))
+
+
+def current_version():
+    try:
+        with open(os.path.join(REGISTRY_DIR, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version_mtime():
+    try:
+        return os.stat(os.path.join(REGISTRY_DIR, CURRENT_FILE)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def set_current(version):
+    if version not in list_versions():
+        raise ValueError(f"Unknown model version: {version}")
+    path = os.path.join(REGISTRY_DIR, CURRENT_FILE)
+    with open(path + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(path + '.tmp', path)
+
+
+def _new_version_dir():
+    # Timestamps have one-second resolution, so registrations within the
+    # same second get a -02, -03... suffix; makedirs claims the name atomically
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    base = datetime.now().strftime('%Y%m%d-%H%M%S')
+    for n in itertools.count(1):
+        version = base if n == 1 else f'{base}-{n:02d}'
+        path = _version_dir(version)
+        try:
+            os.makedirs(path, exist_ok=False)
+        except FileExistsError:
+            continue
+        return version, path
+
+
+def register_model(model, preprocessor, features, metrics=None, make_current=True, forest=None):
+    """Save a trained forest as a new version.
+
+    forest is the CompactForest to serve; pass a reduced-precision or pruned
+    one from CompactForest.from_estimator to register that variant.
+    """
+    version, path = _new_version_dir()
+    forest = forest or CompactForest.from_estimator(model)
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'forest': forest,
+        'preprocessor': preprocessor,
+    }
+    # Uncompressed: compressed joblib files can't be memory-mapped
+    joblib.dump(artifact, os.path.join(path, ARTIFACT_FILE))
+    joblib.dump(model, os.path.join(path, ESTIMATOR_FILE), compress=3)
+    metadata = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'model_type': type(model).__name__,
+        'features': list(features),
+        # Column order of the matrix the model sees
+        'model_inputs': [str(name) for name in preprocessor.get_feature_names_out()],
+        'metrics': metrics or {},
+        'artifact': {
+            'bytes': os.path.getsize(os.path.join(path, ARTIFACT_FILE)),
+            'forest_bytes': int(forest.nbytes),
+            'n_estimators': forest.n_estimators,
+            'leaf_dtype': str(forest.proba.dtype),
+            'depth': forest.depth,
+        },
+    }
+    with open(os.path.join(path, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    if make_current:
+        set_current(version)
+    return version
+
+
+def load_metadata(version):
+    with open(os.path.join(_version_dir(version), 'metadata.json')) as f:
+        return json.load(f)
+
+
+def load_estimator(version=None):
+    """The scikit-learn forest of a version, e.g. to add trees to it."""
+    version = version or current_version()
+    if version is None:
+        raise FileNotFoundError(f"No model registered in {REGISTRY_DIR}; run churn_model.py first")
+    return joblib.load(os.path.join(_version_dir(version), ESTIMATOR_FILE))
+
+
+def load_model(version=None, mmap=MODEL_MMAP, estimator=False):
+    """Load a version for scoring.
+
+    By default the forest arrays are memory-mapped read-only, so workers on
+    one host share a single copy through the page cache. estimator=True
+    also loads the scikit-learn forest, whose compiled predict is faster
+    for scoring every customer in one batch.
+    """
+    version = version or current_version()
+    if version is None:
+        raise FileNotFoundError(f"No model registered in {REGISTRY_DIR}; run churn_model.py first")
+    start = time.perf_counter()
+    metadata = load_metadata(version)
+    artifact = joblib.load(os.path.join(_version_dir(version), ARTIFACT_FILE), mmap_mode='r' if mmap else None)
+    model = load_estimator(version) if estimator else artifact['forest']
+    return ModelBundle(version, model, artifact['preprocessor'], metadata,
+                       load_seconds=round(time.perf_counter() - start, 4))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+# Every preprocessed matrix is float32: the dtype trees split on, and half
+# the memory of float64
+DTYPE = np.float32
+
+
+def _to_numeric(X):
+    # Online requests may send numbers as strings; bad values become NaN
+    # and are imputed like any other missing value
+    if isinstance(X, pd.DataFrame):
+        return np.column_stack([pd.to_numeric(X[col], errors='coerce').to_numpy(DTYPE, na_value=np.nan)
+                                for col in X.columns]) if len(X.columns) else np.empty((len(X), 0), DTYPE)
+    return np.asarray(X, dtype=DTYPE)
+
+
+class CategoryEncoder(BaseEstimator, TransformerMixin):
+    """Ordinal codes per column through pandas' hashed Categorical lookup.
+
+    Categories are the sorted values seen in fit (as LabelEncoder assigned
+    them). Unseen and missing values become -1 instead of raising. Codes
+    come straight out of the Categorical as integers, so no object array
+    is built even for millions of rows.
+    """
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.array(X.columns, dtype=object)
+        self.categories_ = [pd.Index(X[col].dropna().unique()).sort_values() for col in X.columns]
+        return self
+
+    def transform(self, X):
+        X = pd.DataFrame(X, columns=self.feature_names_in_) if not isinstance(X, pd.DataFrame) else X
+        codes = np.empty((len(X), len(self.categories_)), dtype=DTYPE)
+        for i, (col, categories) in enumerate(zip(self.feature_names_in_, self.categories_)):
+            codes[:, i] = pd.Categorical(X[col], categories=categories).codes
+        return codes
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self.feature_names_in_, dtype=object)
+
+
+def numeric_pipeline():
+    """Coerce to float32, fill gaps with the training median, standardize."""
+    return Pipeline([
+        ('numeric', FunctionTransformer(_to_numeric, feature_names_out='one-to-one')),
+        ('impute', SimpleImputer(strategy='median')),
+        ('scale', StandardScaler()),
+    ])
+
+
+def build_preprocessor(categorical_cols, numeric_cols):
+    """Unfitted preprocessor for the churn model.
+
+    Fit it on the training split only; the fitted object is saved with the
+    model and is the only transform training, batch scoring and the online
+    endpoint apply. Output is a float32 matrix with the categorical codes
+    first, then the scaled numeric columns (get_feature_names_out()).
+    """
+    return ColumnTransformer(
+        [
+            ('categorical', CategoryEncoder(), list(categorical_cols)),
+            ('numeric', numeric_pipeline(), list(numeric_cols)),
+        ],
+        remainder='drop',
+        verbose_feature_names_out=False,
+    )
@@ -0,0 +1,282 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sketches import CountMinSketch, HyperLogLog, KLLSketch, SpaceSaving
+
+AGE_BINS = [0, 25, 35, 45, 60, 100]
+AGE_LABELS = ['18-25', '26-35', '36-45', '46-60', '60+']
+PRODUCT_KEY = ['product_id', 'product_name', 'country']
+ORDER_COLUMNS = ['customer_id', 'age', 'product_id', 'product_name', 'country', 'category',
+                 'last_purchase_date', 'unit_price', 'quantity', 'purchase_frequency']
+# Counters kept for top products in approximate mode; revenue estimates are
+# off by at most 1/(PRODUCT_CAPACITY + 1) of total revenue
+PRODUCT_CAPACITY = 2000
+
+
+def _add(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+class SalesAggregator:
+    """Mergeable partial aggregates behind sales_data.json.
+
+    Every field is a sum, count or max, so chunks can be folded in one at a
+    time (or aggregated separately and merged) without holding the orders.
+    The per-product and per-customer tables grow with the data; with
+    approx=True they are replaced by fixed-size sketches (top products and
+    distinct customers only) and the rest stays exact.
+    """
+
+    def __init__(self, approx=False):
+        self.approx = approx
+        self.n_rows = 0
+        self.category_revenue = None
+        self.month_revenue = None
+        self.category_month_revenue = None
+        self.age_counts = None
+        self.frequency_counts = None
+        self.customers = None
+        self.product_revenue = None
+        if approx:
+            self.product_heavy_hitters = SpaceSaving(PRODUCT_CAPACITY)
+            self.product_count_min = CountMinSketch()
+            self.distinct_customers = HyperLogLog()
+
+    def update(self, chunk):
+        revenue = chunk['unit_price'] * chunk['quantity']
+        self.n_rows += len(chunk)
+        self.category_revenue = _add(self.category_revenue, revenue.groupby(chunk['category']).sum())
+        month = chunk['last_purchase_date'].dt.to_period('M')
+        self.month_revenue = _add(self.month_revenue, revenue.groupby(month).sum())
+        self.category_month_revenue = _add(self.category_month_revenue,
+                                           revenue.groupby([chunk['category'], month]).sum())
+        age_group = pd.cut(chunk['age'], bins=AGE_BINS, labels=AGE_LABELS)
+        self.age_counts = _add(self.age_counts, age_group.value_counts())
+        self.frequency_counts = _add(self.frequency_counts, chunk['purchase_frequency'].value_counts())
+        if self.approx:
+            self.product_heavy_hitters.update([chunk[c] for c in PRODUCT_KEY], revenue)
+            self.product_count_min.update(chunk[PRODUCT_KEY], revenue)
+            self.distinct_customers.update(chunk['customer_id'])
+            return self
+        self.product_revenue = _add(self.product_revenue, revenue.groupby([chunk[c] for c in PRODUCT_KEY]).sum())
+
+        customers = pd.DataFrame({
+            'customer_id': chunk['customer_id'],
+            'purchase_frequency': chunk['purchase_frequency'],
+            'revenue': revenue,
+            'last_purchase_date': chunk['last_purchase_date'],
+        }).groupby('customer_id').agg({'purchase_frequency': 'max', 'revenue': 'sum', 'last_purchase_date': 'max'})
+        self._merge_customers(customers)
+        return self
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.category_revenue = _add(self.category_revenue, other.category_revenue)
+        self.month_revenue = _add(self.month_revenue, other.month_revenue)
+        self.category_month_revenue = _add(self.category_month_revenue, other.category_month_revenue)
+        self.age_counts = _add(self.age_counts, other.age_counts)
+        self.frequency_counts = _add(self.frequency_counts, other.frequency_counts)
+        if self.approx:
+            self.product_heavy_hitters.merge(other.product_heavy_hitters)
+            self.product_count_min.merge(other.product_count_min)
+            self.distinct_customers.merge(other.distinct_customers)
+            return self
+        self.product_revenue = _add(self.product_revenue, other.product_revenue)
+        self._merge_customers(other.customers)
+        return self
+
+    def _merge_customers(self, customers):
+        if self.customers is None:
+            self.customers = customers
+            return
+        # Align the running per-customer totals with the chunk's on the
+        # (sorted) customer index: one merge join per chunk instead of
+        # regrouping every customer seen so far
+        current, chunk = self.customers.align(customers, join='outer')
+        self.customers = pd.DataFrame({
+            'purchase_frequency': np.fmax(current['purchase_frequency'], chunk['purchase_frequency'])
+                                  .astype(self.customers['purchase_frequency'].dtype),
+            'revenue': current['revenue'].fillna(0) + chunk['revenue'].fillna(0),
+            'last_purchase_date': np.fmax(current['last_purchase_date'].to_numpy(),
+                                          chunk['last_purchase_date'].to_numpy()),
+        }, index=current.index)
+
+    # ---------- Results ----------
+    def sales_by_category(self):
+        out = self.category_revenue.sort_values(ascending=False).rename('revenue')
+        return out.rename_axis('category').reset_index()
+
+    def revenue_trends(self):
+        out = self.month_revenue.sort_index().rename('revenue').rename_axis('month').reset_index()
+        out['month'] = out['month'].astype(str)
+        return out
+
+    def category_histories(self):
+        # Monthly revenue per category with empty months filled with 0,
+        # labelled by month end like pd.Grouper(freq='M')
+        histories = {}
+        for category, series in self.category_month_revenue.groupby(level=0, sort=False):
+            series = series.droplevel(0).sort_index()
+            months = pd.period_range(series.index.min(), series.index.max(), freq='M')
+            series = series.reindex(months, fill_value=0)
+            histories[category] = pd.DataFrame({
+                'ds': months.to_timestamp(how='end').normalize(),
+                'y': series.to_numpy(),
+            })
+        return histories
+
+    def age_distribution(self):
+        counts = self.age_counts.reindex(AGE_LABELS, fill_value=0).astype(int)
+        out = counts.rename('count').rename_axis('age_group').reset_index()
+        out['age_group'] = out['age_group'].astype(str)
+        return out
+
+    def customer_data(self):
+        return self.customers.reset_index()
+
+    def purchase_frequency_median(self):
+        # Median from value counts, matching Series.median() on the raw column
+        counts = self.frequency_counts.sort_index()
+        cumulative = counts.cumsum().to_numpy()
+        n = int(cumulative[-1])
+        values = counts.index.to_numpy()
+        lower = values[np.searchsorted(cumulative, (n - 1) // 2 + 1)]
+        upper = values[np.searchsorted(cumulative, n // 2 + 1)]
+        return (lower + upper) / 2
+
+    def n_customers(self):
+        return self.distinct_customers.count() if self.approx else len(self.customers)
+
+    def top_products(self, k=10):
+        if self.approx:
+            # Heavy-hitter counters undercount by at most their error and
+            # count-min overcounts; the tighter upper bound ranks candidates
+            candidates = self.product_heavy_hitters.top(PRODUCT_CAPACITY)
+            upper = np.minimum(self.product_count_min.estimate(candidates.index.to_frame(index=False)),
+                               candidates.to_numpy() + self.product_heavy_hitters.error)
+            top = pd.Series(upper, index=candidates.index).nlargest(k).items()
+        else:
+            top = heapq.nlargest(k, self.product_revenue.items(), key=lambda item: item[1])
+        return [dict(zip(PRODUCT_KEY, key), revenue=revenue) for key, revenue in top]
+
+
+def customer_segments(customers, frequency_median, revenue_median, recency_median):
+    """High/Medium/Low Value per customer (purchase_frequency, revenue, recency)."""
+    return np.where(
+        (customers['purchase_frequency'] > frequency_median) &
+        (customers['revenue'] > revenue_median) &
+        (customers['recency'] < recency_median), 'High Value',
+        np.where(customers['revenue'] > revenue_median, 'Medium Value', 'Low Value')
+    )
+
+
+class CustomerSketch:
+    """Quantile sketches of per-customer revenue and recency in days.
+
+    Built from the feature store, where each customer is one row, so
+    partitions never split a customer and their sketches merge exactly.
+    """
+
+    def __init__(self, reference_date, seed=0):
+        self.reference_date = reference_date
+        self.n_customers = 0
+        self.revenue = KLLSketch(seed=seed)
+        self.recency = KLLSketch(seed=seed)
+
+    def update(self, customers):
+        self.n_customers += len(customers)
+        self.revenue.update(customers['revenue'])
+        self.recency.update((self.reference_date - customers['last_purchase_date']).dt.days)
+        return self
+
+    def merge(self, other):
+        self.n_customers += other.n_customers
+        self.revenue.merge(other.revenue)
+        self.recency.merge(other.recency)
+        return self
+
+
+# ---------- Partitioned aggregation ----------
+def parquet_partitions(paths):
+    """(path, row group) pairs; each is aggregated on its own and merged."""
+    import pyarrow.parquet as pq
+
+    return [(path, i) for path in paths for i in range(pq.ParquetFile(path).num_row_groups)]
+
+
+def _read_partition(partition, columns):
+    import pyarrow.parquet as pq
+
+    path, row_group = partition
+    return pq.ParquetFile(path).read_row_group(row_group, columns=columns).to_pandas()
+
+
+def _sketch_orders(partition):
+    return SalesAggregator(approx=True).update(_read_partition(partition, ORDER_COLUMNS))
+
+
+def _sketch_customers(indexed_partition, reference_date):
+    # Seeded by position so compaction coin flips differ between partitions
+    seed, partition = indexed_partition
+    customers = _read_partition(partition, ['revenue', 'last_purchase_date'])
+    return CustomerSketch(reference_date, seed=seed).update(customers)
+
+
+def _count_segments(partition, reference_date, medians):
+    # purchase_frequency is the customer's latest order's value here, the
+    # maximum over orders in exact mode; it is a per-customer attribute
+    customers = _read_partition(partition, ['purchase_frequency', 'revenue', 'last_purchase_date'])
+    customers['recency'] = (reference_date - customers['last_purchase_date']).dt.days
+    return pd.Series(customer_segments(customers, *medians)).value_counts()
+
+
+def _map_partitions(fn, partitions, *args, max_workers=None):
+    # Partitions are independent; results come back in partition order so
+    # merging (and the seeded sketches) is deterministic
+    if len(partitions) == 1:
+        return [fn(partitions[0], *args)]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fn, partitions, *[[arg] * len(partitions) for arg in args]))
+
+
+def sketch_orders(partitions, max_workers=None):
+    """Approximate SalesAggregator over order partitions, built in parallel."""
+    results = _map_partitions(_sketch_orders, partitions, max_workers=max_workers)
+    aggregator = results[0]
+    for other in results[1:]:
+        aggregator.merge(other)
+    return aggregator
+
+
+def approximate_segments(partitions, reference_date, frequency_median, max_workers=None):
+    """Customer segment counts from feature-store partitions.
+
+    One parallel pass sketches the revenue and recency medians (KLL, about
+    1% rank error); a second counts segments against them. Counts are exact
+    for those thresholds. Returns (counts, n_customers).
+    """
+    sketches = _map_partitions(_sketch_customers, list(enumerate(partitions)), reference_date,
+                               max_workers=max_workers)
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    medians = (frequency_median, sketch.revenue.median(), sketch.recency.median())
+    counts = _map_partitions(_count_segments, partitions, reference_date, medians, max_workers=max_workers)
+    total = counts[0]
+    for other in counts[1:]:
+        total = total.add(other, fill_value=0)
+    return total.astype(int), sketch.n_customers
+
+
+def stream_orders(paths, chunksize=100_000):
+    """Aggregate order Parquet files chunk by chunk in flat memory."""
+    import pyarrow.parquet as pq
+
+    aggregator = SalesAggregator()
+    for path in paths:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=ORDER_COLUMNS):
+            aggregator.update(batch.to_pandas())
+    return aggregator
@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from stages import measure
+
+
+def stratified_sample(n_rows, sample_size, strata=None, random_state=42):
+    """Row positions for a sample of about sample_size rows.
+
+    With strata, every stratum keeps its share of the population.
+    """
+    if sample_size is None or sample_size >= n_rows:
+        return np.arange(n_rows)
+    frac = sample_size / n_rows
+    if strata is None:
+        rng = np.random.default_rng(random_state)
+        return np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+    positions = pd.Series(np.arange(n_rows), index=pd.Series(strata).fillna('NA').to_numpy())
+    sample = positions.groupby(level=0).sample(frac=frac, random_state=random_state)
+    return np.sort(sample.to_numpy())
+
+
+def _make_kmeans(k, minibatch, random_state):
+    if minibatch:
+        return MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=3, batch_size=4096)
+    return KMeans(n_clusters=k, random_state=random_state, n_init=10)
+
+
+def segment_customers(X, k_values=(2, 3, 4, 5), sample_size=20000, strata=None,
+                      minibatch=False, time_budget=None, random_state=42):
+    """Pick k by silhouette on a sample and label every row of X.
+
+    Candidates are scored on a (stratified) sample so silhouette's O(n^2)
+    cost is capped. The best candidate's fit is reused to label the full
+    data; with minibatch=True it is refined with MiniBatchKMeans instead.
+    Returns (labels, best_k, timings) where timings maps stage -> seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    idx = stratified_sample(len(X), sample_size, strata, random_state)
+    X_sample = X[idx]
+    timings['sample'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with measure('kmeans_k_search'):
+        best_score, best_k, best_model = _search_k(X_sample, k_values, minibatch, time_budget, random_state)
+    timings['k_search'] = time.perf_counter() - start
+    if best_model is None:
+        raise ValueError(f"Not enough rows to segment into any of k={list(k_values)}")
+
+    start = time.perf_counter()
+    if minibatch and len(idx) < len(X):
+        final = MiniBatchKMeans(n_clusters=best_k, init=best_model.cluster_centers_, n_init=1,
+                                random_state=random_state, batch_size=4096)
+        labels = final.fit_predict(X)
+    else:
+        labels = best_model.predict(X)
+    timings['final_fit'] = time.perf_counter() - start
+    return labels, best_k, timings
+
+
+def _search_k(X_sample, k_values, minibatch, time_budget, random_state):
+    start = time.perf_counter()
+    best_score, best_k, best_model = -1, None, None
+    for k in k_values:
+        if k >= len(X_sample):
+            continue
+        if time_budget is not None and best_model is not None and time.perf_counter() - start > time_budget:
+            print(f"Segmentation time budget reached, stopping k search before k={k}")
+            break
+        model = _make_kmeans(k, minibatch, random_state)
+        labels = model.fit_predict(X_sample)
+        try:
+            score = silhouette_score(X_sample, labels)
+        except ValueError:
+            score = -1
+        if score > best_score or best_model is None:
+            best_score, best_k, best_model = score, k, model
+    return best_score, best_k, best_model
@@ -0,0 +1,217 @@
+"""Mergeable sketches for approximate dashboard summaries.
+
+Each sketch is built per partition in bounded memory and merged with
+merge(), so summaries over any number of orders can be computed in
+parallel. Error bounds with the default sizes:
+
+- KLLSketch (k=200): quantiles are within about 1% of n in rank (the
+  returned median lies between the 49th and 51st percentiles), with high
+  probability. Memory is O(k) values however many are added.
+- HyperLogLog (p=14): distinct counts have a standard error of
+  1.04 / sqrt(2**p), 0.8%, in 16 KiB of registers.
+- CountMinSketch (width 2**14, depth 4): estimates never undercount and
+  overcount by at most e / width (0.017%) of the total weight, with
+  probability 1 - e**-depth (98%) per key.
+- SpaceSaving (capacity m): every key weighing more than total / (m + 1)
+  is kept, and each kept estimate undercounts by at most error (also at
+  most total / (m + 1)). Deterministic.
+"""
+import numpy as np
+import pandas as pd
+
+
+def hash64(values):
+    """64-bit hashes of a Series, array, or the rows of a DataFrame."""
+    if not isinstance(values, (pd.Series, pd.DataFrame)):
+        values = pd.Series(values)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+class KLLSketch:
+    """Quantiles of a stream of numbers in O(k) memory.
+
+    Values live in levels; an item at level h stands for 2**h originals.
+    A level over its capacity is sorted and every other item (from a random
+    offset) moves up, which halves it while keeping ranks unbiased. Lower
+    levels get geometrically smaller capacities, as in KLL.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # With an odd count one item stays so weights still sum to n
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge KLL sketches with k={self.k} and k={other.k}")
+        self.levels += [np.empty(0)] * (len(other.levels) - len(self.levels))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        ranks = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1])
+        return values[order][np.minimum(ranks, len(values) - 1)]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class HyperLogLog:
+    """Distinct count of hashed values in 2**p one-byte registers."""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    def update(self, values):
+        h = hash64(values)
+        p = np.uint64(self.p)
+        index = (h >> (np.uint64(64) - p)).astype(np.int64)
+        rest = h << p
+        # Leading zeros of the remaining bits, from exact float exponents of each half
+        high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+        low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+        bit_length = np.where(high > 0, high + 32, low)
+        rank = np.minimum(65 - bit_length, 65 - self.p).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with p={self.p} and p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are empty
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """Summed weight per key; estimates are upper bounds.
+
+    Rows index a shared 64-bit hash by multiply-shift with their own odd
+    multiplier. Sketches merge only with the same width, depth and seed.
+    """
+
+    def __init__(self, width=2 ** 14, depth=4, seed=0):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0.0
+        self.table = np.zeros((depth, width))
+        self._multipliers = np.random.default_rng(seed).integers(1, 2 ** 63, size=depth, dtype=np.uint64) * 2 + 1
+
+    def _indexes(self, keys):
+        h = hash64(keys)
+        shift = np.uint64(64 - self.width.bit_length() + 1)
+        return [((h * a) >> shift).astype(np.int64) for a in self._multipliers]
+
+    def update(self, keys, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        self.total += weights.sum()
+        for row, index in enumerate(self._indexes(keys)):
+            self.table[row] += np.bincount(index, weights=weights, minlength=self.width)
+        return self
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Count-min sketches must share width, depth and seed to merge")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def estimate(self, keys):
+        return np.min([self.table[row, index] for row, index in enumerate(self._indexes(keys))], axis=0)
+
+
+class SpaceSaving:
+    """Heaviest keys by total weight, in at most capacity counters.
+
+    The mergeable (Misra-Gries) form of Space-Saving: when more keys than
+    counters are held, the (capacity + 1)-th largest weight is subtracted
+    from every counter and non-positive ones are dropped. Counters are
+    lower bounds; the true weight is at most counter + error. Keys are a
+    Series or a list of Series (held as a MultiIndex) aligned with weights.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = None
+        self.total = 0.0
+        self.error = 0.0
+
+    def _absorb(self, counts):
+        combined = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        if len(combined) > self.capacity:
+            cut = combined.nlargest(self.capacity + 1).iloc[-1]
+            combined = combined[combined > cut] - cut
+            self.error += cut
+        self.counts = combined
+
+    def update(self, keys, weights):
+        first = keys[0] if isinstance(keys, list) else keys
+        batch = pd.Series(np.asarray(weights, dtype=np.float64), index=first.index).groupby(keys, sort=False).sum()
+        self.total += float(batch.sum())
+        self._absorb(batch)
+        return self
+
+    def merge(self, other):
+        if other.counts is not None:
+            self.total += other.total
+            self.error += other.error
+            self._absorb(other.counts)
+        return self
+
+    def top(self, k):
+        """Up to k heaviest keys as (lower bound) weights, heaviest first."""
+        if self.counts is None:
+            return pd.Series(dtype=np.float64)
+        return self.counts.nlargest(k)
@@ -0,0 +1,117 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Lines starting with this prefix are machine-readable progress events; the
+# backend job runner parses them from the script's stdout.
+EVENT_PREFIX = '##stage '
+
+# Set PIPELINE_PROFILE=<path> to dump cProfile stats for the whole run
+PROFILE_PATH = os.getenv('PIPELINE_PROFILE')
+
+
+def _emit(event):
+    print(EVENT_PREFIX + json.dumps(event), flush=True)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def process_memory_mb():
+    """Current resident memory, split into private (anon) and file-backed pages.
+
+    File-backed pages include memory-mapped model arrays, which every
+    process mapping the same file shares. Linux only; {} elsewhere.
+    """
+    fields = {'VmRSS': 'rss_mb', 'RssAnon': 'anon_mb', 'RssFile': 'file_mb'}
+    memory = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except FileNotFoundError:
+        pass
+    return memory
+
+
+class _Usage:
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def since(self):
+        return {
+            'seconds': round(time.perf_counter() - self.wall, 3),
+            'cpu_seconds': round(time.process_time() - self.cpu, 3),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+@contextmanager
+def measure(name):
+    """Record wall time, CPU time and peak RSS for one step inside a stage.
+
+    Usable from any module (CSV load, date parsing, model fits, dumps)
+    without access to the script's StageTracker.
+    """
+    usage = _Usage()
+    yield
+    _emit({'stage': name, 'event': 'measure', **usage.since()})
+
+
+class StageTracker:
+    """Times the named stages of a pipeline script.
+
+    Call begin() between top-level script sections; each call closes the
+    previous stage. With PIPELINE_PROFILE set, the run is profiled and stats
+    are dumped by summary().
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._current = None
+        self._usage = None
+        self._profiler = None
+        if PROFILE_PATH:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def begin(self, name):
+        self.end()
+        self._current = name
+        self._usage = _Usage()
+        _emit({'stage': name, 'event': 'start'})
+
+    def end(self):
+        if self._current is None:
+            return
+        usage = self._usage.since()
+        self.timings[self._current] = self.timings.get(self._current, 0) + usage['seconds']
+        _emit({'stage': self._current, 'event': 'end', **usage})
+        self._current = None
+
+    def summary(self):
+        self.end()
+        total = sum(self.timings.values())
+        print("Stage timings: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in self.timings.items())
+              + f" (total {total:.2f}s, peak RSS {peak_rss_mb()} MB)")
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(PROFILE_PATH)
+            print(f"Profile written to {PROFILE_PATH} (inspect with python -m pstats)")
+        return self.timings
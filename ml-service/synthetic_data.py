@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# The shipped sample supplies the vocabulary (products, categories, countries,
+# statuses) and the value ranges that synthetic orders are drawn from
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'dataset.csv')
+COLUMNS = ['order_id', 'customer_id', 'age', 'gender', 'product_id', 'country', 'signup_date',
+           'last_purchase_date', 'cancellations_count', 'subscription_status', 'unit_price', 'quantity',
+           'purchase_frequency', 'product_name', 'category', 'Ratings']
+
+# Share of dates written in each format; the sample mixes zero-padded and
+# unpadded month-first dates, ISO dates are what other exports send
+DATE_FORMATS = {'padded': 0.6, 'unpadded': 0.3, 'iso': 0.1}
+# Orders span this many years up to end_date (default: today, so recency
+# and churn labels look like a live export; pass one for identical files)
+HISTORY_YEARS = 6
+
+
+class Catalog:
+    """Value distributions taken from the sample dataset."""
+
+    def __init__(self, sample):
+        self.products = (sample.groupby(['category', 'product_name'])['unit_price'].median()
+                         .rename('base_price').reset_index())
+        self.categorical = {
+            col: sample[col].value_counts(normalize=True)
+            for col in ['gender', 'country', 'subscription_status']
+        }
+        self.age = (int(sample['age'].min()), int(sample['age'].max()))
+        self.ratings = (float(sample['Ratings'].mean()), float(sample['Ratings'].std()))
+        self.max_quantity = int(sample['quantity'].max())
+        self.max_cancellations = int(sample['cancellations_count'].max())
+        self.max_frequency = int(sample['purchase_frequency'].max())
+
+    @classmethod
+    def from_sample(cls, path=SAMPLE_CSV):
+        return cls(pd.read_csv(path))
+
+    def draw(self, rng, col, size):
+        dist = self.categorical[col]
+        return rng.choice(dist.index.to_numpy(), size=size, p=dist.to_numpy())
+
+
+@lru_cache(maxsize=None)
+def _date_tables(start, span):
+    # One row per format, one column per day since start
+    calendar = pd.date_range(start, periods=span + 1, freq='D')
+    padded = pd.Series(calendar.strftime('%m/%d/%Y'))
+    formatted = {
+        'padded': padded,
+        # 07/01/2021 -> 7/1/2021, without the platform-specific %-m
+        'unpadded': padded.str.replace(r'\b0(\d)', r'\1', regex=True),
+        'iso': pd.Series(calendar.strftime('%Y-%m-%d')),
+    }
+    return np.stack([formatted[name].to_numpy(dtype=object) for name in DATE_FORMATS])
+
+
+def _format_days(rng, start, span, days):
+    """Day offsets from start as strings in mixed formats.
+
+    Only the calendar is formatted, so this stays cheap at 10^7 rows.
+    """
+    tables = _date_tables(start, span)
+    choice = rng.choice(len(DATE_FORMATS), size=len(days), p=list(DATE_FORMATS.values()))
+    return tables[choice, days]
+
+
+class SyntheticOrders:
+    """Seeded generator of orders with the schema of data/dataset.csv.
+
+    Customers place repeat orders (a heavy-tailed number per customer) and
+    keep their own age, country, signup date and subscription across them.
+    Output is produced in chunks, so 10^7 rows never sit in memory at once.
+    """
+
+    def __init__(self, n_rows, seed=42, orders_per_customer=3.0, n_products=None, catalog=None, end_date=None):
+        self.n_rows = n_rows
+        self.seed = seed
+        self.catalog = catalog or Catalog.from_sample()
+        self.end_date = pd.Timestamp(end_date or pd.Timestamp.now()).normalize()
+        self.start_date = self.end_date - pd.DateOffset(years=HISTORY_YEARS)
+        self.span = (self.end_date - self.start_date).days
+        rng = np.random.default_rng(seed)
+
+        n_customers = max(1, int(n_rows / orders_per_customer))
+        span = self.span
+        self.customers = pd.DataFrame({
+            'customer_id': np.char.add('CUST', np.arange(n_customers).astype(str)),
+            'age': rng.integers(self.catalog.age[0], self.catalog.age[1] + 1, size=n_customers),
+            'gender': self.catalog.draw(rng, 'gender', n_customers),
+            'country': self.catalog.draw(rng, 'country', n_customers),
+            'subscription_status': self.catalog.draw(rng, 'subscription_status', n_customers),
+            'cancellations_count': rng.integers(0, self.catalog.max_cancellations + 1, size=n_customers),
+            'purchase_frequency': rng.integers(1, self.catalog.max_frequency + 1, size=n_customers),
+            # Signups happen in the first two thirds so customers have time to order
+            'signup_day': rng.integers(0, span * 2 // 3, size=n_customers),
+        })
+        # Heavy-tailed order counts: a few customers order far more than most
+        weights = rng.pareto(1.5, size=n_customers) + 1
+        self.customer_p = weights / weights.sum()
+
+        n_products = n_products or max(len(self.catalog.products), n_rows // 500)
+        template = rng.integers(0, len(self.catalog.products), size=n_products)
+        base = self.catalog.products.iloc[template].reset_index(drop=True)
+        self.products = pd.DataFrame({
+            'product_id': np.char.add('PROD', np.arange(n_products).astype(str)),
+            'product_name': base['product_name'].to_numpy(),
+            'category': base['category'].to_numpy(),
+            'price': (base['base_price'] * rng.lognormal(0, 0.25, size=n_products)).to_numpy(),
+        })
+
+    def chunks(self, chunksize=1_000_000):
+        span = self.span
+        for index, start in enumerate(range(0, self.n_rows, chunksize)):
+            size = min(chunksize, self.n_rows - start)
+            rng = np.random.default_rng([self.seed, index])
+            customers = self.customers.iloc[rng.choice(len(self.customers), size=size, p=self.customer_p)]
+            products = self.products.iloc[rng.integers(0, len(self.products), size=size)]
+            signup = customers['signup_day'].to_numpy()
+            purchase = signup + (rng.random(size) * (span - signup)).astype(np.int64)
+            rating_mean, rating_std = self.catalog.ratings
+            chunk = pd.DataFrame({
+                'order_id': np.char.add('ORD', np.arange(start, start + size).astype(str)),
+                'customer_id': customers['customer_id'].to_numpy(),
+                'age': customers['age'].to_numpy(),
+                'gender': customers['gender'].to_numpy(),
+                'product_id': products['product_id'].to_numpy(),
+                'country': customers['country'].to_numpy(),
+                'signup_date': _format_days(rng, self.start_date, span, signup),
+                'last_purchase_date': _format_days(rng, self.start_date, span, purchase),
+                'cancellations_count': customers['cancellations_count'].to_numpy(),
+                'subscription_status': customers['subscription_status'].to_numpy(),
+                'unit_price': (products['price'].to_numpy() * rng.lognormal(0, 0.05, size=size)).round(2),
+                'quantity': rng.integers(1, self.catalog.max_quantity + 1, size=size),
+                'purchase_frequency': customers['purchase_frequency'].to_numpy(),
+                'product_name': products['product_name'].to_numpy(),
+                'category': products['category'].to_numpy(),
+                'Ratings': rng.normal(rating_mean, rating_std, size=size).clip(1, 5).round(1),
+            })
+            yield chunk[COLUMNS]
+
+    def write_csv(self, path, chunksize=1_000_000):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Temp file and rename, like the other data writers
+        with open(path + '.tmp', 'w', newline='') as f:
+            for index, chunk in enumerate(self.chunks(chunksize)):
+                chunk.to_csv(f, index=False, header=index == 0)
+        os.replace(path + '.tmp', path)
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic order export with the dataset.csv schema')
+    parser.add_argument('--rows', type=int, default=10_000, help='orders to generate (10^4 to 10^7)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--orders-per-customer', type=float, default=3.0)
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    parser.add_argument('--end-date', default=None, help='last order date (default: today)')
+    parser.add_argument('--output', default=None, help='CSV path (default: data/synthetic/orders_<rows>.csv)')
+    args = parser.parse_args()
+
+    output = args.output or f'data/synthetic/orders_{args.rows}.csv'
+    start = time.perf_counter()
+    generator = SyntheticOrders(args.rows, seed=args.seed, orders_per_customer=args.orders_per_customer,
+                                end_date=args.end_date)
+    generator.write_csv(output, chunksize=args.chunksize)
+    print(f"Wrote {args.rows} orders for {len(generator.customers)} customers to {output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from compact_forest import CompactForest
+
+
+def _forest():
+    X, y = make_classification(n_samples=2000, n_features=8, random_state=0)
+    X = X.astype(np.float32)
+    return RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), X
+
+
+def test_matches_sklearn():
+    model, X = _forest()
+    forest = CompactForest.from_estimator(model)
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+
+def test_pruning_shrinks_arrays():
+    model, X = _forest()
+    full = CompactForest.from_estimator(model)
+    pruned = CompactForest.from_estimator(model, max_depth=4)
+    assert pruned.depth == 4
+    assert pruned.nbytes < full.nbytes
+    assert CompactForest.from_estimator(model, max_depth=3).nbytes < pruned.nbytes
+    assert CompactForest.from_estimator(model, leaf_dtype='float16', max_depth=3).nbytes < \
+        CompactForest.from_estimator(model, leaf_dtype='float16').nbytes
+
+
+def test_pruned_leaves_use_subtree_distribution():
+    model, X = _forest()
+    pruned = CompactForest.from_estimator(model, max_depth=3)
+    # Each tree stops at the node the sample reaches at depth 3 (or its leaf)
+    expected = np.mean([
+        tree.tree_.value[[row.indices[min(3, len(row.indices) - 1)] for row in tree.decision_path(X)], 0, 1]
+        for tree in model.estimators_
+    ], axis=0)
+    np.testing.assert_allclose(pruned.predict_proba(X)[:, 1], expected, atol=1e-12)
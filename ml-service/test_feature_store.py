@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+
+import feature_store
+from ingest import read_orders_csv
+from sales_aggregates import parquet_partitions
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'dataset.csv')
+
+
+def test_chunked_build_matches_one_pass(tmp_path, monkeypatch):
+    orders = read_orders_csv(DATASET)
+    # Repeat customers, so their orders span several chunks
+    orders['customer_id'] = 'CUST' + (orders.index % 500).astype(str)
+    # A missing value in a later chunk widens age to float after earlier parts were written
+    orders.loc[1500, 'age'] = None
+    csv_path = tmp_path / 'orders.csv'
+    orders.to_csv(csv_path, index=False, date_format='%Y-%m-%d')
+    monkeypatch.chdir(tmp_path)
+
+    features = feature_store.build(str(csv_path), chunksize=300)
+
+    assert len(feature_store.order_parts()) == 7
+    expected = feature_store.compute_customer_features(read_orders_csv(str(csv_path)))
+    pd.testing.assert_frame_equal(features.set_index('customer_id').sort_index(),
+                                  expected.set_index('customer_id').sort_index())
+    assert len(feature_store.load_orders()) == len(orders)
+    revenue = feature_store.load_revenue_rollup()['revenue'].sum()
+    assert abs(revenue - (orders['unit_price'] * orders['quantity']).sum()) < 1e-6
+
+
+def test_store_is_split_into_row_groups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(feature_store, 'ROW_GROUP_SIZE', 300)
+
+    feature_store.build(DATASET, chunksize=1000)
+
+    assert len(feature_store.order_parts()) == 2
+    assert len(parquet_partitions(feature_store.order_parts())) == 8
+    assert len(parquet_partitions([feature_store.FEATURES_PATH])) == 7
@@ -0,0 +1,68 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.utils.class_weight import compute_class_weight
+
+from preprocessing import build_preprocessor
+from stages import measure
+
+FEATURES = ['age', 'gender', 'country', 'days_since_signup', 'days_since_last_purchase',
+            'cancellations_count', 'unit_price', 'quantity', 'purchase_frequency', 'category', 'Ratings']
+CATEGORICAL_COLS = ['gender', 'country', 'category']
+NUMERIC_COLS = ['age', 'days_since_signup', 'days_since_last_purchase',
+                'cancellations_count', 'unit_price', 'quantity', 'purchase_frequency', 'Ratings']
+
+
+def label_churn(df):
+    # Churn = 1 if days_since_last_purchase > 90 or cancellations_count > 2 or subscription_status != 'active'
+    return ((df['days_since_last_purchase'] > 90) |
+            (df['cancellations_count'] > 2) |
+            (df['subscription_status'] != 'active')).astype(int)
+
+
+def fit_preprocessing(df_train):
+    """Fit the shared preprocessor on training rows only; returns (X_train, preprocessor)."""
+    preprocessor = build_preprocessor(CATEGORICAL_COLS, NUMERIC_COLS)
+    X_train = preprocessor.fit_transform(df_train[FEATURES])
+    return X_train, preprocessor
+
+
+def fit_forest(X_train, y_train, n_estimators=100, n_jobs=-1, random_state=42):
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state,
+                                   class_weight='balanced', n_jobs=n_jobs)
+    with measure('rf_fit'):
+        model.fit(X_train, y_train)
+    print(f"Fitted {n_estimators} trees (n_jobs={n_jobs})")
+    return model
+
+
+def balanced_class_weight(y):
+    """class_weight='balanced' as a fixed dict, computed over all of y."""
+    classes = np.unique(y)
+    return dict(zip(classes.tolist(), compute_class_weight('balanced', classes=classes, y=y)))
+
+
+def add_trees(model, X_new, y_new, n_new_trees, n_jobs=-1, class_weight=None):
+    # Existing trees are kept as-is; only the new ones see X_new. 'balanced'
+    # would weight classes by the delta rows alone, so the caller passes
+    # weights computed over every labelled customer
+    model.set_params(warm_start=True, n_jobs=n_jobs, n_estimators=model.n_estimators + n_new_trees,
+                     class_weight=class_weight if class_weight is not None else model.class_weight)
+    with measure('rf_warm_start_fit'):
+        model.fit(X_new, y_new)
+    print(f"Added {n_new_trees} trees ({model.n_estimators} total, n_jobs={n_jobs})")
+    return model
+
+
+def evaluate(model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'n_test': int(len(X_test)),
+        'n_estimators': int(model.n_estimators),
+    }
+    # ROC-AUC is undefined when the test split holds a single class
+    if y_test.nunique() > 1:
+        metrics['roc_auc'] = float(roc_auc_score(y_test, y_pred_proba))
+    return metrics
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pandas as pd
+
+from category_forecasts import CACHE_DIR, series_key
+from stages import measure
+
+# Scalars and vectors Prophet's optimizer accepts as its starting point;
+# vectors whose shape no longer matches (more changepoints) are reset by Prophet
+SCALAR_PARAMS = ['k', 'm', 'sigma_obs']
+VECTOR_PARAMS = ['delta', 'beta']
+
+
+def _state_path(name):
+    return os.path.join(CACHE_DIR, f'trend-{name}.json')
+
+
+def _load_state(name):
+    if not os.path.exists(_state_path(name)):
+        return None
+    with open(_state_path(name)) as f:
+        return json.load(f)
+
+
+def warm_start_params(model):
+    """Fitted parameters of model in the form Prophet.fit(init=...) takes."""
+    params = {name: float(model.params[name][0][0]) for name in SCALAR_PARAMS}
+    params.update({name: model.params[name][0] for name in VECTOR_PARAMS})
+    return params
+
+
+def _fit(name, hist, prophet_params, state):
+    from prophet import Prophet
+    from prophet.serialize import model_from_json
+
+    init = None
+    if state is not None:
+        try:
+            init = warm_start_params(model_from_json(state['model']))
+        except Exception as e:
+            print(f"{name}: previous model unreadable ({e}), fitting from scratch")
+    with measure(f'prophet_fit:{name}'):
+        model = Prophet(**prophet_params)
+        try:
+            model.fit(hist, init=init) if init else model.fit(hist)
+        except Exception:
+            if init is None:
+                raise
+            print(f"{name}: warm start failed, fitting from scratch")
+            model = Prophet(**prophet_params)
+            model.fit(hist)
+    return model
+
+
+def forecast_trend(name, hist, periods, freq='M', prophet_params=None):
+    """Prophet forecast of hist (ds, y) over hist's dates plus periods more.
+
+    The fitted model and forecast are kept per trend name. When hist and
+    the settings hash to the kept key the forecast is returned without
+    importing Prophet; otherwise the fit starts from the kept parameters,
+    which converges in fewer iterations when only recent months changed.
+    Returns DataFrame(ds, yhat, yhat_lower, yhat_upper).
+    """
+    prophet_params = prophet_params or {}
+    key = series_key(hist, [prophet_params, freq], periods)
+    state = _load_state(name)
+    if state is not None and state['key'] == key:
+        print(f"{name}: history unchanged, reusing forecast")
+        forecast = pd.DataFrame(state['forecast'])
+        forecast['ds'] = pd.to_datetime(forecast['ds'])
+        return forecast
+
+    from prophet.serialize import model_to_json
+
+    model = _fit(name, hist, prophet_params, state)
+    forecast = model.predict(model.make_future_dataframe(periods=periods, freq=freq))
+    forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    records = forecast.assign(ds=forecast['ds'].dt.strftime('%Y-%m-%d')).to_dict('records')
+    tmp_path = _state_path(name) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'key': key, 'model': model_to_json(model), 'forecast': records}, f)
+    os.replace(tmp_path, _state_path(name))
+    return forecast